@@ -256,6 +256,139 @@ namespace DesktopAgnostic.Config
     {
       this.get_backend (group, key).set_value (group, key, value);
     }
+    /**
+     * Retrieves the values of several configuration keys at once. The
+     * instance configuration is handled like in {@link get_value}.
+     * @see Backend.get_values
+     */
+    public ValueArray
+    get_values (string[] groups, string[] keys) throws GLib.Error
+    {
+      ValueArray values;
+
+      if (this.instance == null)
+      {
+        return this.global.get_values (groups, keys);
+      }
+
+      if (groups.length != keys.length)
+      {
+        throw new Error.LENGTH_MISMATCH ("Got %d groups for %d keys.",
+                                         groups.length, keys.length);
+      }
+
+      values = new ValueArray (keys.length);
+      for (int i = 0; i < keys.length; i++)
+      {
+        values.append (this.get_value (groups[i], keys[i]));
+      }
+
+      return values;
+    }
+    /**
+     * Sets several configuration keys at once. The keys are split between
+     * the global and instance configurations, each of which saves its part
+     * in one go.
+     * @see Backend.set_values
+     */
+    public void
+    set_values (string[] groups, string[] keys,
+                ValueArray values) throws GLib.Error
+    {
+      string[] instance_groups = {};
+      string[] instance_keys = {};
+      ValueArray instance_values;
+      string[] global_groups = {};
+      string[] global_keys = {};
+      ValueArray global_values;
+      GLib.Error? error = null;
+
+      if (this.instance == null)
+      {
+        this.global.set_values (groups, keys, values);
+        return;
+      }
+
+      if (groups.length != keys.length || values.n_values != keys.length)
+      {
+        throw new Error.LENGTH_MISMATCH ("Got %d groups and %u values for %d keys.",
+                                         groups.length, values.n_values,
+                                         keys.length);
+      }
+
+      instance_values = new ValueArray (keys.length);
+      global_values = new ValueArray (keys.length);
+      for (int i = 0; i < keys.length; i++)
+      {
+        if (this.get_backend (groups[i], keys[i]) == this.instance)
+        {
+          instance_groups += groups[i];
+          instance_keys += keys[i];
+          instance_values.append (values.get_nth (i));
+        }
+        else
+        {
+          global_groups += groups[i];
+          global_keys += keys[i];
+          global_values.append (values.get_nth (i));
+        }
+      }
+
+      // set both parts, and report the first error afterwards
+      if (instance_keys.length > 0)
+      {
+        try
+        {
+          this.instance.set_values (instance_groups, instance_keys,
+                                    instance_values);
+        }
+        catch (GLib.Error err)
+        {
+          error = err;
+        }
+      }
+      if (global_keys.length > 0)
+      {
+        try
+        {
+          this.global.set_values (global_groups, global_keys, global_values);
+        }
+        catch (GLib.Error err)
+        {
+          if (error == null)
+          {
+            error = err;
+          }
+        }
+      }
+      if (error != null)
+      {
+        throw error;
+      }
+    }
+    /**
+     * Retrieves the values of all of the configuration keys in a group.
+     * @see Backend.get_group
+     */
+    public ValueArray
+    get_group (string group, out string[] keys) throws GLib.Error
+    {
+      string[] groups;
+
+      if (this.instance == null)
+      {
+        return this.global.get_group (group, out keys);
+      }
+
+      keys = Backend.get_group_keys (this._schema, group);
+      groups = new string[keys.length];
+      for (int i = 0; i < keys.length; i++)
+      {
+        groups[i] = group;
+      }
+
+      return this.get_values (groups, keys);
+    }
     public void
     notify_add (string group, string key, NotifyFunc callback) throws GLib.Error
     {
@@ -272,6 +405,57 @@ namespace DesktopAgnostic.Config
     {
       this.get_backend (group, key).notify_remove (group, key, callback);
     }
+    /**
+     * Starts a batch of changes on the global and instance configurations.
+     * @see Backend.begin_transaction
+     */
+    public void
+    begin_transaction ()
+    {
+      this.global.begin_transaction ();
+      if (this.instance != null)
+      {
+        this.instance.begin_transaction ();
+      }
+    }
+    /**
+     * Saves the changes made since {@link begin_transaction} and sends the
+     * notifications.
+     * @see Backend.commit_transaction
+     */
+    public void
+    commit_transaction () throws GLib.Error
+    {
+      GLib.Error? error = null;
+
+      // both transactions have to end, report the first error afterwards
+      if (this.instance != null)
+      {
+        try
+        {
+          this.instance.commit_transaction ();
+        }
+        catch (GLib.Error err)
+        {
+          error = err;
+        }
+      }
+      try
+      {
+        this.global.commit_transaction ();
+      }
+      catch (GLib.Error err)
+      {
+        if (error == null)
+        {
+          error = err;
+        }
+      }
+      if (error != null)
+      {
+        throw error;
+      }
+    }
     public void
     remove_instance ()
     {
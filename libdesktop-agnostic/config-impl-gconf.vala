@@ -31,7 +31,7 @@ namespace DesktopAgnostic.Config
     private string path;
     private unowned GConf.Client client;
     private uint connection_id;
-    private Datalist<unowned SList<NotifyDelegate>> _notifiers;
+    private NotifyRegistry _notifiers;
 
     public override string name
     {
@@ -54,7 +54,7 @@ namespace DesktopAgnostic.Config
       Schema schema = this.schema;
 
       this.connection_id = 0;
-      this._notifiers = Datalist<SList<NotifyDelegate>> ();
+      this._notifiers = new NotifyRegistry ();
       base_path = schema.get_metadata_option (opt_prefix +
                                               "base_path").get_string ();
       this.schema_path = "/schemas%s/%s".printf (base_path, schema.app_name);
@@ -368,18 +368,16 @@ namespace DesktopAgnostic.Config
     private void
     notify_proxy (GConf.Client client, uint cnxn_id, GConf.Entry entry)
     {
-      string full_key = entry.get_key ();
       string group;
       string key;
-      Value value;
+      unowned NotifyKey? listeners;
 
-      this.parse_group_and_key (full_key, out group, out key);
-      value = this.gconfvalue_to_gvalue (group, key, entry.get_value ());
-      unowned SList<NotifyDelegate> notify_func_list =
-        this._notifiers.get_data (full_key);
-      foreach (unowned NotifyDelegate notify_func in notify_func_list)
+      this.parse_group_and_key (entry.get_key (), out group, out key);
+      listeners = this._notifiers.lookup (group, key);
+      if (listeners != null)
       {
-        notify_func.execute (group, key, value);
+        listeners.execute (this.gconfvalue_to_gvalue (group, key,
+                                                      entry.get_value ()));
       }
     }
 
@@ -402,29 +400,16 @@ namespace DesktopAgnostic.Config
     public override void
     notify_add (string group, string key, NotifyFunc callback) throws GLib.Error
     {
-      NotifyDelegate notify;
-      string full_key;
-      unowned SList<NotifyDelegate>? callbacks;
-
-      notify = new NotifyDelegate (callback);
-      full_key = this.generate_key (group, key);
-      callbacks = this._notifiers.get_data (full_key);
-      callbacks.append ((owned)notify);
-      this._notifiers.set_data (full_key, callbacks);
+      this._notifiers.add (group, key, callback);
     }
 
     public override void
     notify (string group, string key) throws GLib.Error
     {
-      string full_key = this.generate_key (group, key);
-      unowned SList<NotifyDelegate> notifications;
-      Value value;
-
-      notifications = this._notifiers.get_data (full_key);
-      value = this.get_value (group, key);
-      foreach (unowned NotifyDelegate notify in notifications)
+      unowned NotifyKey? listeners = this._notifiers.lookup (group, key);
+      if (listeners != null)
       {
-        notify.execute (group, key, value);
+        listeners.execute (this.get_value (group, key));
       }
     }
 
@@ -432,18 +417,7 @@ namespace DesktopAgnostic.Config
     notify_remove (string group, string key,
                    NotifyFunc callback) throws GLib.Error
     {
-      string full_key = this.generate_key (group, key);
-      unowned SList<NotifyDelegate> funcs = this._notifiers.get_data (full_key);
-      NotifyDelegate ndata = new NotifyDelegate (callback);
-      unowned SList<NotifyDelegate>? node;
-
-      node = funcs.find_custom (ndata, (CompareFunc)NotifyDelegate.compare);
-      if (node != null)
-      {
-        node.data = null;
-        funcs.delete_link (node);
-        this._notifiers.set_data (full_key, funcs);
-      }
+      this._notifiers.remove (group, key, callback);
     }
 
     public override void
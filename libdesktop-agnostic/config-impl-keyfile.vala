@@ -24,6 +24,16 @@ using DesktopAgnostic;
 
 namespace DesktopAgnostic.Config
 {
+  /**
+   * The default number of milliseconds without any change after which the
+   * modified configuration is saved.
+   */
+  private const int AUTOSAVE_DELAY = 500;
+  /**
+   * The default number of unsaved changes which trigger a save regardless of
+   * the delay.
+   */
+  private const int AUTOSAVE_THRESHOLD = 64;
   public class GKeyFile : Backend
   {
     private KeyFile _data;
@@ -31,8 +41,21 @@ namespace DesktopAgnostic.Config
     private VFS.FileMonitor _keyfile_monitor;
     private ulong _monitor_changed_id;
     private string _checksum;
+    private string? _written_checksum;
+    private string? _writing;
+    private string? _writing_checksum;
+    private string? _next_write;
+    private string? _next_checksum;
+    private int _autosave_delay;
+    private int _autosave_threshold;
+    private uint _autosave_id;
+    private int _changes;
     private bool _autosave;
-    private Datalist<unowned SList<NotifyDelegate>> _notifiers;
+    private uint _transaction_depth;
+    private bool _dirty;
+    private KeyFile _pending;
+    private KeyFile _unsaved;
+    private NotifyRegistry _notifiers;
     public override string name
     {
       owned get
@@ -45,39 +68,154 @@ namespace DesktopAgnostic.Config
     {
       this._autosave = true;
       this._monitor_changed_id = 0;
+      this._autosave_id = 0;
+      this._changes = 0;
+      this._transaction_depth = 0;
+      this._dirty = false;
       if (this.schema != null)
       {
         this._data = new KeyFile ();
-        this._notifiers = Datalist<SList<NotifyDelegate>> ();
+        this._pending = new KeyFile ();
+        this._unsaved = new KeyFile ();
+        this._notifiers = new NotifyRegistry ();
       }
     }
 
     /**
-     * Saves the current state of the configuration to the filesystem,
-     * suppressing the "changed" signal from the file monitor.
+     * Saves the current state of the configuration to the filesystem. The
+     * file is written asynchronously by GIO, which replaces it atomically
+     * (through a temporary file and a rename), unless @sync is true or no
+     * main loop is running. The checksums of the data being written, of the
+     * data queued after it and of the last data written are kept, so that
+     * the file monitor does not report our own writes as external changes.
      */
     private void
-    save_config (bool calc_chksum = true) throws GLib.Error
+    save_config (bool calc_chksum = true, bool sync = false) throws GLib.Error
     {
       string data;
+
+      if (this._autosave_id != 0)
+      {
+        Source.remove (this._autosave_id);
+        this._autosave_id = 0;
+      }
+      this._changes = 0;
+      this._unsaved = new KeyFile ();
+
       data = this._data.to_data (null);
       if (calc_chksum)
       {
         this._checksum = calculate_checksum_from_data (data);
       }
 
-      if (this._monitor_changed_id != 0)
+      if (this._writing != null)
+      {
+        // only the latest state has to be written after the current write
+        this._next_write = data;
+        this._next_checksum = this._checksum;
+      }
+      else
+      {
+        this.write_config (data, this._checksum, sync);
+      }
+    }
+
+    private void
+    write_config (string data, string checksum,
+                  bool sync = false) throws GLib.Error
+    {
+      GLib.File impl = (GLib.File)this._keyfile.implementation;
+
+      if (sync || MainContext.depth () == 0)
+      {
+        // outside of the main loop, nothing would complete the write
+        this._keyfile.replace_contents (data);
+        this._written_checksum = checksum;
+        return;
+      }
+      // keep the buffer and the backend alive until the write is done
+      this._writing = data;
+      this._writing_checksum = checksum;
+      this.ref ();
+      impl.replace_contents_async (this._writing.data, null, false,
+                                   FileCreateFlags.NONE, null,
+                                   this.on_config_written);
+    }
+
+    private void
+    on_config_written (Object? obj, AsyncResult res)
+    {
+      string etag;
+
+      try
       {
-        // block changed signal
-        SignalHandler.block (this._keyfile_monitor, this._monitor_changed_id);
+        ((GLib.File)obj).replace_contents_async.end (res, out etag);
       }
-      // save config file
-      this._keyfile.replace_contents (data);
-      if (this._monitor_changed_id != 0)
+      catch (GLib.Error err)
       {
-        // unblock changed signal
-        SignalHandler.unblock (this._keyfile_monitor, this._monitor_changed_id);
+        critical ("Failed to save the configuration: %s", err.message);
       }
+      this._writing = null;
+      this._written_checksum = (owned)this._writing_checksum;
+      if (this._next_write != null)
+      {
+        string data = (owned)this._next_write;
+        string checksum = (owned)this._next_checksum;
+        try
+        {
+          this.write_config (data, checksum);
+        }
+        catch (GLib.Error err)
+        {
+          critical ("Failed to save the configuration: %s", err.message);
+        }
+      }
+      this.unref ();
+    }
+
+    /**
+     * Marks the configuration as modified. It is saved once no change has
+     * been made for the autosave delay, or right away when the number of
+     * unsaved changes reaches the autosave threshold.
+     */
+    private void
+    queue_save () throws GLib.Error
+    {
+      this._changes++;
+      if (this._autosave_delay <= 0 ||
+          this._changes >= this._autosave_threshold)
+      {
+        this.save_config ();
+      }
+      else
+      {
+        if (this._autosave_id != 0)
+        {
+          Source.remove (this._autosave_id);
+        }
+        this._autosave_id = add_autosave_source (this, this._autosave_delay);
+      }
+    }
+
+    private static uint
+    add_autosave_source (GKeyFile backend, int delay)
+    {
+      // The source must not keep the backend alive, so that dispose () can
+      // flush the pending changes when the last reference goes away.
+      unowned GKeyFile self = backend;
+      return Timeout.add ((uint)delay, () =>
+      {
+        self._autosave_id = 0;
+        try
+        {
+          self.save_config ();
+        }
+        catch (GLib.Error err)
+        {
+          critical ("Failed to save the configuration: %s", err.message);
+        }
+        return false;
+      });
     }
 
     private string
@@ -96,18 +234,80 @@ namespace DesktopAgnostic.Config
 
     /**
      * Saves the current configuration state to the filesystem (if autosave is
-     * on) and emits the notify signal.
+     * on) and emits the notify signal. Inside a transaction, both are
+     * postponed until the transaction is committed.
      */
     private void
     update_config (string group, string key) throws GLib.Error
     {
+      if (this._transaction_depth > 0)
+      {
+        if (this._autosave)
+        {
+          this._dirty = true;
+          this._unsaved.set_boolean (group, key, true);
+        }
+        // the keyfile is only used as an ordered set of the changed keys
+        this._pending.set_boolean (group, key, true);
+        return;
+      }
       if (this._autosave)
       {
-        this.save_config ();
+        this._unsaved.set_boolean (group, key, true);
+        this.queue_save ();
       }
       this.notify (group, key);
     }
 
+    public override void
+    begin_transaction ()
+    {
+      this._transaction_depth++;
+    }
+
+    public override void
+    commit_transaction () throws GLib.Error
+    {
+      if (this._transaction_depth == 0)
+      {
+        warning ("commit_transaction () called without begin_transaction ().");
+        return;
+      }
+      this._transaction_depth--;
+      if (this._transaction_depth > 0)
+      {
+        return;
+      }
+
+      KeyFile pending = (owned)this._pending;
+      GLib.Error? error = null;
+      this._pending = new KeyFile ();
+      if (this._dirty)
+      {
+        this._dirty = false;
+        try
+        {
+          this.save_config ();
+        }
+        catch (GLib.Error err)
+        {
+          // the values changed in memory, notify before reporting the error
+          error = err;
+        }
+      }
+      foreach (unowned string group in pending.get_groups ())
+      {
+        foreach (unowned string key in pending.get_keys (group))
+        {
+          this.notify (group, key);
+        }
+      }
+      if (error != null)
+      {
+        throw error;
+      }
+    }
+
     private void
     load_data (VFS.File file)
     {
@@ -140,111 +340,91 @@ namespace DesktopAgnostic.Config
       }
     }
 
+    /**
+     * Copies the value of a key from the given keyfile through the typed
+     * setters, which only update the configuration (and queue the
+     * notification) when the value differs.
+     */
     private void
     set_value_from_keyfile (KeyFile keyfile, string group, string key) throws GLib.Error
     {
       SchemaOption option = this.schema.get_option (group, key);
       Type type = option.option_type;
-      if (type == typeof (bool))
-      {
-        bool val;
-        try
-        {
-          val = keyfile.get_boolean (group, key);
-        }
-        catch (KeyFileError e)
-        {
-          return;
-        }
-        this._data.set_boolean (group, key, val);
-        this.update_config (group, key);
-      }
-      else if (type == typeof (int))
+      try
       {
-        int val;
-        try
+        if (type == typeof (bool))
         {
-          val = keyfile.get_integer (group, key);
-        }
-        catch (KeyFileError e)
-        {
-          return;
+          this.set_bool (group, key, keyfile.get_boolean (group, key));
         }
-        this._data.set_integer (group, key, val);
-        this.update_config (group, key);
-      }
-      else if (type == typeof (float))
-      {
-        float val;
-        try
+        else if (type == typeof (int))
         {
-          val = (float)keyfile.get_double (group, key);
+          this.set_int (group, key, keyfile.get_integer (group, key));
         }
-        catch (KeyFileError e)
+        else if (type == typeof (float))
         {
-          return;
+          this.set_float (group, key, (float)keyfile.get_double (group, key));
         }
-        this._data.set_double (group, key, val);
-        this.update_config (group, key);
-      }
-      else if (type == typeof (string))
-      {
-        string val;
-        try
+        else if (type == typeof (ValueArray))
         {
-          val = keyfile.get_string (group, key);
+          this.set_list (group, key,
+                         this.generate_valuearray_from_keyfile (keyfile, group,
+                                                                key));
         }
-        catch (KeyFileError e)
+        else // Treat it as a string.
         {
-          return;
+          if (type != typeof (string) && Schema.find_type (type) == null)
+          {
+            throw new Error.INVALID_TYPE ("'%s' is an invalid config type.",
+                                          type.name ());
+          }
+          this.set_string (group, key, keyfile.get_string (group, key));
         }
-        this._data.set_string (group, key, val);
-        this.update_config (group, key);
       }
-      else if (type == typeof (ValueArray))
+      catch (KeyFileError e)
       {
-        ValueArray arr;
-        try
-        {
-          arr = this.generate_valuearray_from_keyfile (keyfile, group, key);
-        }
-        catch (KeyFileError e)
-        {
-          return;
-        }
-        this.set_list (group, key, arr);
+        // the new value cannot be parsed, keep the current one
+        return;
       }
-      else // Treat it as a string.
-      {
-        SchemaType? st = Schema.find_type (type);
-        if (st == null)
-        {
-          throw new Error.INVALID_TYPE ("'%s' is an invalid config type.",
-                                        type.name ());
-        }
+    }
 
-        string val;
-        try
-        {
-          val = keyfile.get_string (group, key);
-        }
-        catch (KeyFileError e)
-        {
-          return;
-        }
-        this._data.set_string (group, key, val);
-        this.update_config (group, key);
-      }
+    /**
+     * Determines whether the data read from the configuration file was
+     * written by this object: the current state, the write in progress, the
+     * write queued after it, or the last completed write, whose monitor
+     * events can arrive after newer changes were made.
+     */
+    private bool
+    is_own_data (string checksum)
+    {
+      return checksum == this._checksum ||
+             checksum == this._writing_checksum ||
+             checksum == this._next_checksum ||
+             checksum == this._written_checksum;
+    }
+
+    private bool
+    is_unsaved (string group, string key) throws KeyFileError
+    {
+      return this._unsaved.has_group (group) &&
+             this._unsaved.has_key (group, key);
     }
 
+    /**
+     * Merges the configuration file into the current configuration. Only
+     * the keys whose serialized value differs are parsed and updated. Keys
+     * changed locally since the last save keep their value, and are written
+     * back with the merged configuration. The configuration is saved at most
+     * once, and the notifications are sent after that.
+     */
     private void
     update_from_keyfile (string data) throws GLib.Error
     {
       string checksum = calculate_checksum_from_data (data);
 
-      if (this._checksum != checksum)
+      if (!this.is_own_data (checksum))
       {
         unowned Schema? schema = this.schema;
+        GLib.Error? error = null;
         if (schema == null)
         {
           throw new Error.NO_SCHEMA ("The schema was not loaded.");
@@ -252,35 +432,72 @@ namespace DesktopAgnostic.Config
 
         KeyFile new_data = new KeyFile ();
         new_data.load_from_data (data, data.length, KeyFileFlags.NONE);
+        // the file was changed after our last write, whose data must not be
+        // mistaken for our own anymore (e.g. when an edit is reverted)
+        this._written_checksum = null;
 
+        // the transaction has to end whatever happens, otherwise nothing
+        // would be saved or notified anymore
+        this.begin_transaction ();
         this._autosave = false;
-        foreach (unowned string group in schema.get_groups ())
+        try
         {
-          if(this._data.has_group (group) && new_data.has_group (group))
+          foreach (unowned string group in schema.get_groups ())
           {
+            if (!new_data.has_group (group))
+            {
+              continue;
+            }
             foreach (unowned string key in schema.get_keys (group))
             {
-              // Only add if there is a new key/value pair.
-              if (new_data.has_key (group, key))
+              if (!new_data.has_key (group, key) ||
+                  this.is_unsaved (group, key) ||
+                  (this._data.has_group (group) &&
+                   this._data.has_key (group, key) &&
+                   this._data.get_value (group, key) == new_data.get_value (group, key)))
               {
-                // If it's a ValueArray defer checking if it's updated to set_list().
-                if (schema.get_option (group, key).option_type == typeof (ValueArray) ||
-                    (this._data.has_key (group, key) &&
-                     this._data.get_value (group, key) != new_data.get_value (group, key)))
-                {
-                  this.set_value_from_keyfile (new_data, group, key);
-                }
+                continue;
               }
+              this.set_value_from_keyfile (new_data, group, key);
             }
           }
         }
+        catch (GLib.Error err)
+        {
+          error = err;
+        }
         this._autosave = true;
 
-        calculate_checksum ();
-        if (this._checksum != checksum)
+        try
+        {
+          calculate_checksum ();
+          if (this._checksum != checksum)
+          {
+            // Only save if they are still different after the update.
+            this.save_config (false);
+          }
+        }
+        catch (GLib.Error err)
+        {
+          if (error == null)
+          {
+            error = err;
+          }
+        }
+        try
+        {
+          this.commit_transaction ();
+        }
+        catch (GLib.Error err)
+        {
+          if (error == null)
+          {
+            error = err;
+          }
+        }
+        if (error != null)
         {
-          // Only save if they are still different after the update.
-          this.save_config(false);
+          throw error;
         }
       }
     }
@@ -450,10 +667,25 @@ namespace DesktopAgnostic.Config
     public override void
     constructed ()
     {
+      string opt_prefix = this.name + ".";
       string base_path;
       string path;
       Schema schema = this.schema;
 
+      try
+      {
+        this._autosave_delay =
+          schema.get_metadata_option (opt_prefix + "autosave_delay").get_int ();
+        this._autosave_threshold =
+          schema.get_metadata_option (opt_prefix + "autosave_threshold").get_int ();
+      }
+      catch (SchemaError err)
+      {
+        // the schema was created before this module was loaded
+        this._autosave_delay = AUTOSAVE_DELAY;
+        this._autosave_threshold = AUTOSAVE_THRESHOLD;
+      }
+
       base_path = Path.build_filename (Environment.get_user_config_dir (),
                                        "desktop-agnostic");
       if (this.instance_id == null)
@@ -480,7 +712,9 @@ namespace DesktopAgnostic.Config
         else
         {
           this.ensure_directory (Path.get_dirname (path));
-          this.reset ();
+          // the file must exist before the monitor is created
+          this.reset_nosave ();
+          this.save_config (true, true);
         }
       }
       catch (GLib.Error e)
@@ -496,6 +730,30 @@ namespace DesktopAgnostic.Config
       Idle.add (this.create_file_monitor);
     }
 
+    public override void
+    dispose ()
+    {
+      if (this._autosave_id != 0 || this._dirty)
+      {
+        if (this._autosave_id != 0)
+        {
+          Source.remove (this._autosave_id);
+          this._autosave_id = 0;
+        }
+        this._dirty = false;
+        // the backend is going away, write the pending changes right now
+        try
+        {
+          this._keyfile.replace_contents (this._data.to_data (null));
+        }
+        catch (GLib.Error err)
+        {
+          critical ("Failed to save the configuration: %s", err.message);
+        }
+      }
+      base.dispose ();
+    }
+
     ~GKeyFile ()
     {
       this._keyfile_monitor.cancel ();
@@ -537,41 +795,23 @@ namespace DesktopAgnostic.Config
     public override void
     notify_add (string group, string key, NotifyFunc callback) throws GLib.Error
     {
-      string full_key = "%s/%s".printf (group, key);
-      unowned SList<NotifyDelegate>? funcs = this._notifiers.get_data (full_key);
-      NotifyDelegate data = new NotifyDelegate (callback);
-      funcs.append ((owned)data);
-      this._notifiers.set_data (full_key, funcs);
+      this._notifiers.add (group, key, callback);
     }
 
     public override void
     notify (string group, string key) throws GLib.Error
     {
-      string full_key = "%s/%s".printf (group, key);
-      Value value = this.get_value (group, key);
-      unowned SList<NotifyDelegate> funcs = this._notifiers.get_data (full_key);
-      foreach (unowned NotifyDelegate data in funcs)
+      unowned NotifyKey? listeners = this._notifiers.lookup (group, key);
+      if (listeners != null)
       {
-          // Modified according to config-impl-gconf.vala
-          data.execute (group, key, value);
+        listeners.execute (this.get_value (group, key));
       }
     }
 
     public override void
     notify_remove (string group, string key, NotifyFunc callback) throws GLib.Error
     {
-      string full_key = "%s/%s".printf (group, key);
-      unowned SList<NotifyDelegate> funcs = this._notifiers.get_data (full_key);
-      NotifyDelegate ndata = new NotifyDelegate (callback);
-      unowned SList<NotifyDelegate>? node;
-
-      node = funcs.find_custom (ndata, (CompareFunc)NotifyDelegate.compare);
-      if (node != null)
-      {
-        node.data = null;
-        funcs.delete_link (node);
-        this._notifiers.set_data (full_key, funcs);
-      }
+      this._notifiers.remove (group, key, callback);
     }
 
     /**
@@ -904,6 +1144,14 @@ namespace DesktopAgnostic.Config
 public Type
 register_plugin ()
 {
+  GLib.Value val;
+  unowned HashTable<string,GLib.Value?> backend_metadata_keys;
+
+  backend_metadata_keys = Config.Backend.get_backend_metadata_keys ();
+  val = Config.AUTOSAVE_DELAY;
+  backend_metadata_keys.insert ("GKeyFile.autosave_delay", val);
+  val = Config.AUTOSAVE_THRESHOLD;
+  backend_metadata_keys.insert ("GKeyFile.autosave_threshold", val);
   return typeof (DesktopAgnostic.Config.GKeyFile);
 }
 
@@ -25,7 +25,7 @@ namespace DesktopAgnostic.Config
   public class Memory : Backend
   {
     private Datalist<Value?> values;
-    private Datalist<unowned SList<NotifyDelegate>> _notifiers;
+    private NotifyRegistry _notifiers;
     public override string name
     {
       owned get
@@ -46,7 +46,7 @@ namespace DesktopAgnostic.Config
         {
           critical ("Error: %s", err.message);
         }
-        this._notifiers = Datalist<SList<NotifyDelegate>> ();
+        this._notifiers = new NotifyRegistry ();
       }
     }
 
@@ -74,43 +74,23 @@ namespace DesktopAgnostic.Config
     public override void
     notify_add (string group, string key, NotifyFunc callback) throws GLib.Error
     {
-      string full_key = "%s/%s".printf (group, key);
-      unowned SList<NotifyDelegate>? funcs = this._notifiers.get_data (full_key);
-      NotifyDelegate data = new NotifyDelegate (callback);
-      funcs.append ((owned)data);
-      this._notifiers.set_data (full_key, funcs);
+      this._notifiers.add (group, key, callback);
     }
 
     public override void
     notify (string group, string key) throws GLib.Error
     {
-      string full_key = "%s/%s".printf (group, key);
-      Value value = this.get_value (group, key);
-      unowned SList<NotifyDelegate> funcs = this._notifiers.get_data (full_key);
-      foreach (unowned NotifyDelegate data in funcs)
+      unowned NotifyKey? listeners = this._notifiers.lookup (group, key);
+      if (listeners != null)
       {
-        if (data != null && data.callback != null)
-        {
-          data.execute (group, key, value);
-        }
+        listeners.execute (this.get_value (group, key));
       }
     }
 
     public override void
     notify_remove (string group, string key, NotifyFunc callback) throws GLib.Error
     {
-      string full_key = "%s/%s".printf (group, key);
-      unowned SList<NotifyDelegate> funcs = this._notifiers.get_data (full_key);
-      NotifyDelegate ndata = new NotifyDelegate (callback);
-      unowned SList<NotifyDelegate>? node;
-
-      node = funcs.find_custom (ndata, (CompareFunc)NotifyDelegate.compare);
-      if (node != null)
-      {
-        node.data = null;
-        funcs.delete_link (node);
-        this._notifiers.set_data (full_key, funcs);
-      }
+      this._notifiers.remove (group, key, callback);
     }
 
     public override void
@@ -78,4 +78,279 @@ desktop_agnostic_config_notify_delegate_free (DesktopAgnosticConfigNotifyDelegat
   g_slice_free (DesktopAgnosticConfigNotifyDelegate, self);
 }
 
+static guint
+desktop_agnostic_config_notify_delegate_hash (gconstpointer data)
+{
+  const DesktopAgnosticConfigNotifyDelegate *self;
+
+  self = (const DesktopAgnosticConfigNotifyDelegate*)data;
+
+  return g_direct_hash (self->callback) ^ g_direct_hash (self->target);
+}
+
+static gboolean
+desktop_agnostic_config_notify_delegate_equal (gconstpointer a,
+                                               gconstpointer b)
+{
+  return desktop_agnostic_config_notify_delegate_compare ((gpointer)a,
+                                                          (gpointer)b) == 0;
+}
+
+/*
+ * The callbacks associated with a single configuration key. The structure
+ * doubles as a handle for the key: once looked up, it can be used to send
+ * notifications without building or hashing the key name again.
+ */
+typedef struct _DesktopAgnosticConfigNotifyKey
+{
+  gchar *group;
+  gchar *key;
+  /* the delegates, in the order in which they were added */
+  GQueue delegates;
+  /* delegate => its link in the queue, for constant time removal */
+  GHashTable *links;
+  /* the number of nested execute () calls, during which the removed
+   * delegates are only disabled, so that the links stay valid */
+  guint executing;
+  gboolean has_removed;
+} DesktopAgnosticConfigNotifyKey;
+
+static DesktopAgnosticConfigNotifyKey *
+desktop_agnostic_config_notify_key_new (const gchar *group, const gchar *key)
+{
+  DesktopAgnosticConfigNotifyKey *self;
+
+  self = g_slice_new0 (DesktopAgnosticConfigNotifyKey);
+  self->group = g_strdup (group);
+  self->key = g_strdup (key);
+  g_queue_init (&self->delegates);
+  self->links = g_hash_table_new (desktop_agnostic_config_notify_delegate_hash,
+                                  desktop_agnostic_config_notify_delegate_equal);
+
+  return self;
+}
+
+static void
+desktop_agnostic_config_notify_key_purge (DesktopAgnosticConfigNotifyKey *self)
+{
+  GList *link;
+  GList *next;
+
+  for (link = self->delegates.head; link != NULL; link = next)
+  {
+    DesktopAgnosticConfigNotifyDelegate *delegate = link->data;
+
+    next = link->next;
+    if (delegate->callback == NULL)
+    {
+      desktop_agnostic_config_notify_delegate_free (delegate);
+      g_queue_delete_link (&self->delegates, link);
+    }
+  }
+  self->has_removed = FALSE;
+}
+
+static void
+desktop_agnostic_config_notify_key_execute (DesktopAgnosticConfigNotifyKey *self,
+                                            GValue *value)
+{
+  GList *link;
+
+  /* the callbacks may add or remove callbacks of the same key: removed
+   * delegates are disabled until the outermost call returns */
+  self->executing++;
+  for (link = self->delegates.head; link != NULL; link = link->next)
+  {
+    DesktopAgnosticConfigNotifyDelegate *delegate = link->data;
+
+    if (delegate->callback != NULL)
+    {
+      desktop_agnostic_config_notify_delegate_execute (delegate, self->group,
+                                                       self->key, value);
+    }
+  }
+  self->executing--;
+
+  if (self->executing == 0 && self->has_removed)
+  {
+    desktop_agnostic_config_notify_key_purge (self);
+  }
+}
+
+static void
+desktop_agnostic_config_notify_key_free (DesktopAgnosticConfigNotifyKey *self)
+{
+  GList *link;
+
+  g_hash_table_destroy (self->links);
+  for (link = self->delegates.head; link != NULL; link = link->next)
+  {
+    desktop_agnostic_config_notify_delegate_free (link->data);
+  }
+  g_queue_clear (&self->delegates);
+  g_free (self->group);
+  g_free (self->key);
+  g_slice_free (DesktopAgnosticConfigNotifyKey, self);
+}
+
+/*
+ * Maps the configuration keys to their callbacks, without concatenating (or
+ * interning) the group and key names.
+ */
+typedef struct _DesktopAgnosticConfigNotifyRegistry
+{
+  /* group => (key => DesktopAgnosticConfigNotifyKey) */
+  GHashTable *groups;
+} DesktopAgnosticConfigNotifyRegistry;
+
+static DesktopAgnosticConfigNotifyRegistry *
+desktop_agnostic_config_notify_registry_new (void)
+{
+  DesktopAgnosticConfigNotifyRegistry *self;
+
+  self = g_slice_new0 (DesktopAgnosticConfigNotifyRegistry);
+  self->groups = g_hash_table_new_full (g_str_hash, g_str_equal, g_free,
+                                        (GDestroyNotify)g_hash_table_destroy);
+
+  return self;
+}
+
+static DesktopAgnosticConfigNotifyKey *
+desktop_agnostic_config_notify_registry_get_key (DesktopAgnosticConfigNotifyRegistry *self,
+                                                 const gchar *group,
+                                                 const gchar *key,
+                                                 gboolean create)
+{
+  GHashTable *keys;
+  DesktopAgnosticConfigNotifyKey *nkey = NULL;
+
+  keys = g_hash_table_lookup (self->groups, group);
+  if (keys == NULL)
+  {
+    if (!create)
+    {
+      return NULL;
+    }
+    keys = g_hash_table_new_full (g_str_hash, g_str_equal, NULL,
+                                  (GDestroyNotify)desktop_agnostic_config_notify_key_free);
+    g_hash_table_insert (self->groups, g_strdup (group), keys);
+  }
+  else
+  {
+    nkey = g_hash_table_lookup (keys, key);
+  }
+
+  if (nkey == NULL && create)
+  {
+    nkey = desktop_agnostic_config_notify_key_new (group, key);
+    /* the key name is owned by the handle */
+    g_hash_table_insert (keys, nkey->key, nkey);
+  }
+
+  return nkey;
+}
+
+static void
+desktop_agnostic_config_notify_registry_add (DesktopAgnosticConfigNotifyRegistry *self,
+                                             const gchar *group,
+                                             const gchar *key,
+                                             DesktopAgnosticConfigNotifyFunc callback,
+                                             gpointer target)
+{
+  DesktopAgnosticConfigNotifyKey *nkey;
+  DesktopAgnosticConfigNotifyDelegate *delegate;
+
+  g_return_if_fail (callback != NULL);
+
+  nkey = desktop_agnostic_config_notify_registry_get_key (self, group, key,
+                                                          TRUE);
+  delegate = desktop_agnostic_config_notify_delegate_new (callback, target);
+  g_queue_push_tail (&nkey->delegates, delegate);
+  /* the same callback can be added more than once, the removal picks the
+   * first one, as find_custom () would */
+  if (g_hash_table_lookup (nkey->links, delegate) == NULL)
+  {
+    g_hash_table_insert (nkey->links, delegate, nkey->delegates.tail);
+  }
+}
+
+static gboolean
+desktop_agnostic_config_notify_registry_remove (DesktopAgnosticConfigNotifyRegistry *self,
+                                                const gchar *group,
+                                                const gchar *key,
+                                                DesktopAgnosticConfigNotifyFunc callback,
+                                                gpointer target)
+{
+  DesktopAgnosticConfigNotifyKey *nkey;
+  DesktopAgnosticConfigNotifyDelegate needle = { callback, NULL, target };
+  GList *link;
+  GList *other;
+
+  nkey = desktop_agnostic_config_notify_registry_get_key (self, group, key,
+                                                          FALSE);
+  if (nkey == NULL)
+  {
+    return FALSE;
+  }
+
+  link = g_hash_table_lookup (nkey->links, &needle);
+  if (link == NULL)
+  {
+    return FALSE;
+  }
+  g_hash_table_remove (nkey->links, link->data);
+
+  /* point the table to the next copy of the same callback, if any */
+  for (other = link->next; other != NULL; other = other->next)
+  {
+    if (desktop_agnostic_config_notify_delegate_equal (other->data, &needle))
+    {
+      g_hash_table_insert (nkey->links, other->data, other);
+      break;
+    }
+  }
+
+  if (nkey->executing > 0)
+  {
+    ((DesktopAgnosticConfigNotifyDelegate*)link->data)->callback = NULL;
+    nkey->has_removed = TRUE;
+  }
+  else
+  {
+    desktop_agnostic_config_notify_delegate_free (link->data);
+    g_queue_delete_link (&nkey->delegates, link);
+  }
+
+  return TRUE;
+}
+
+/*
+ * Returns the handle of the key if it has at least one callback, so that the
+ * caller can skip retrieving the value otherwise. The handle stays valid for
+ * the lifetime of the registry.
+ */
+static DesktopAgnosticConfigNotifyKey *
+desktop_agnostic_config_notify_registry_lookup (DesktopAgnosticConfigNotifyRegistry *self,
+                                                const gchar *group,
+                                                const gchar *key)
+{
+  DesktopAgnosticConfigNotifyKey *nkey;
+
+  nkey = desktop_agnostic_config_notify_registry_get_key (self, group, key,
+                                                          FALSE);
+  if (nkey == NULL || g_queue_is_empty (&nkey->delegates))
+  {
+    return NULL;
+  }
+
+  return nkey;
+}
+
+static void
+desktop_agnostic_config_notify_registry_free (DesktopAgnosticConfigNotifyRegistry *self)
+{
+  g_hash_table_destroy (self->groups);
+  g_slice_free (DesktopAgnosticConfigNotifyRegistry, self);
+}
+
 /* vim: set et ts=2 sts=2 sw=2 ai : */
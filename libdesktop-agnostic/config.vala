@@ -35,7 +35,8 @@ namespace DesktopAgnostic.Config
     KEY_NOT_FOUND,
     METADATA_NOT_FOUND,
     NOTIFY,
-    DUPLICATE_BINDING
+    DUPLICATE_BINDING,
+    LENGTH_MISMATCH
   }
   /**
    * The placeholder used for the default group. In some backends, this
@@ -124,6 +125,25 @@ namespace DesktopAgnostic.Config
      * other things
      */
     public abstract void notify_remove (string group, string key, NotifyFunc callback) throws GLib.Error;
+    /**
+     * Starts a batch of changes. Until the matching call to
+     * {@link commit_transaction}, the backend may postpone saving the new
+     * values and sending the notifications. Transactions can be nested.
+     */
+    public virtual void
+    begin_transaction ()
+    {
+    }
+    /**
+     * Ends a batch of changes started by {@link begin_transaction}. When the
+     * outermost transaction ends, the changes are saved and the notifications
+     * for the keys which were modified are sent.
+     * @throws Error if the configuration could not be saved
+     */
+    public virtual void
+    commit_transaction () throws GLib.Error
+    {
+    }
     public abstract Value get_value (string group, string key) throws GLib.Error;
     /**
      * Sets the configuration option to the specified value.
@@ -179,6 +199,129 @@ namespace DesktopAgnostic.Config
         }
       }
     }
+    /**
+     * Retrieves the values of several configuration options at once.
+     * @param groups the group of each option
+     * @param keys the key of each option, in the same order as the groups
+     * @return the values of the options, in the same order as the keys
+     * @throws Error if the number of groups and keys differ, or if one of
+     * the values could not be retrieved
+     */
+    public virtual ValueArray
+    get_values (string[] groups, string[] keys) throws GLib.Error
+    {
+      ValueArray values;
+
+      if (groups.length != keys.length)
+      {
+        throw new Error.LENGTH_MISMATCH ("Got %d groups for %d keys.",
+                                         groups.length, keys.length);
+      }
+
+      values = new ValueArray (keys.length);
+      for (int i = 0; i < keys.length; i++)
+      {
+        values.append (this.get_value (groups[i], keys[i]));
+      }
+
+      return values;
+    }
+    /**
+     * Sets several configuration options at once, inside a transaction, so
+     * that the changes are saved together.
+     * @param groups the group of each option
+     * @param keys the key of each option, in the same order as the groups
+     * @param values the new values of the options, in the same order as the
+     * keys
+     * @throws Error if the number of groups, keys and values differ, or if
+     * one of the values could not be set
+     * @see begin_transaction
+     */
+    public virtual void
+    set_values (string[] groups, string[] keys,
+                ValueArray values) throws GLib.Error
+    {
+      GLib.Error? error = null;
+
+      if (groups.length != keys.length || values.n_values != keys.length)
+      {
+        throw new Error.LENGTH_MISMATCH ("Got %d groups and %u values for %d keys.",
+                                         groups.length, values.n_values,
+                                         keys.length);
+      }
+
+      this.begin_transaction ();
+      try
+      {
+        for (int i = 0; i < keys.length; i++)
+        {
+          this.set_value (groups[i], keys[i], values.get_nth (i));
+        }
+      }
+      catch (GLib.Error err)
+      {
+        error = err;
+      }
+      // save what was set before an error, but report the first error
+      try
+      {
+        this.commit_transaction ();
+      }
+      catch (GLib.Error err)
+      {
+        if (error == null)
+        {
+          error = err;
+        }
+      }
+      if (error != null)
+      {
+        throw error;
+      }
+    }
+    /**
+     * Retrieves the values of all of the configuration options in a group.
+     * @param group the group name
+     * @param keys the keys of the group, as listed in the schema
+     * @return the values of the options, in the same order as the keys
+     * @throws Error if the group does not exist in the schema, or if one of
+     * the values could not be retrieved
+     */
+    public virtual ValueArray
+    get_group (string group, out string[] keys) throws GLib.Error
+    {
+      string[] groups;
+
+      keys = get_group_keys (this._schema, group);
+      groups = new string[keys.length];
+      for (int i = 0; i < keys.length; i++)
+      {
+        groups[i] = group;
+      }
+
+      return this.get_values (groups, keys);
+    }
+    internal static string[]
+    get_group_keys (Schema schema, string group) throws Error
+    {
+      unowned List<unowned string>? group_keys = schema.get_keys (group);
+      string[] keys;
+      int i = 0;
+
+      if (group_keys == null)
+      {
+        throw new Error.KEY_NOT_FOUND ("Could not find the group in the schema: %s.",
+                                       group);
+      }
+
+      keys = new string[group_keys.length ()];
+      foreach (unowned string key in group_keys)
+      {
+        keys[i++] = key;
+      }
+
+      return keys;
+    }
     public abstract bool get_bool (string group, string key) throws GLib.Error;
     public abstract void set_bool (string group, string key, bool value) throws GLib.Error;
     public abstract float get_float (string group, string key) throws GLib.Error;
@@ -0,0 +1,220 @@
+/*
+ * Desktop Agnostic Library: Benchmark for reloading a modified keyfile.
+ *
+ * Copyright (C) 2026 the libdesktop-agnostic developers
+ *
+ * This program is free software; you can redistribute it and/or modify
+ * it under the terms of the GNU General Public License as published by
+ * the Free Software Foundation; either version 2 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU General Public License for more details.
+ *
+ * You should have received a copy of the GNU General Public License
+ * along with this program; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301  USA.
+ */
+
+/*
+ * Creates a GKeyFile configuration with 1,000 keys, then repeatedly changes
+ * a single key in the .ini file behind its back and measures the time until
+ * the change notification arrives, along with the number of notifications
+ * sent for each reload.
+ *
+ * Usage: bench-config-reload [RUNS]
+ */
+
+using DesktopAgnostic;
+
+const int GROUPS = 10;
+const int KEYS_PER_GROUP = 100;
+const string APP_NAME = "bench-config-reload";
+
+class Benchmark
+{
+  Config.Backend cfg;
+  string ini_path;
+  uint notify_counter;
+
+  public Benchmark (string schema_path) throws Error
+  {
+    Config.Schema schema = new Config.Schema (schema_path);
+    this.cfg = Config.new (schema);
+    this.ini_path = Path.build_filename (Environment.get_user_config_dir (),
+                                         "desktop-agnostic",
+                                         "%s.ini".printf (APP_NAME));
+    this.notify_counter = 0;
+  }
+
+  public string
+  name ()
+  {
+    return this.cfg.name;
+  }
+
+  static string
+  option_type (int key)
+  {
+    switch (key % 4)
+    {
+      case 0:
+        return "integer";
+      case 1:
+        return "boolean";
+      case 2:
+        return "float";
+      default:
+        return "string";
+    }
+  }
+
+  static string
+  option_default (int key)
+  {
+    switch (key % 4)
+    {
+      case 0:
+        return key.to_string ();
+      case 1:
+        return "true";
+      case 2:
+        return "%d.5".printf (key);
+      default:
+        return "value %d".printf (key);
+    }
+  }
+
+  public static string
+  write_schema (string dir) throws Error
+  {
+    StringBuilder sb = new StringBuilder ();
+    string path;
+
+    for (int g = 0; g < GROUPS; g++)
+    {
+      for (int k = 0; k < KEYS_PER_GROUP; k++)
+      {
+        sb.append_printf ("[group%d/key%d]\ntype = %s\ndefault = %s\n" +
+                          "description = Benchmark key\n\n",
+                          g, k, option_type (k), option_default (k));
+      }
+    }
+    path = Path.build_filename (dir, "%s.schema-ini".printf (APP_NAME));
+    FileUtils.set_contents (path, sb.str);
+    return path;
+  }
+
+  void
+  on_changed (string group, string key, Value value)
+  {
+    this.notify_counter++;
+  }
+
+  static void
+  spin (MainContext ctx, double seconds)
+  {
+    Timer timer = new Timer ();
+    while (timer.elapsed () < seconds)
+    {
+      ctx.iteration (false);
+      Thread.usleep (1000);
+    }
+  }
+
+  public void
+  run (int runs) throws Error
+  {
+    MainContext ctx = MainContext.default ();
+    double[] times = new double[runs];
+
+    // let the backend write the file and set up its file monitor
+    spin (ctx, 1.0);
+
+    for (int g = 0; g < GROUPS; g++)
+    {
+      for (int k = 0; k < KEYS_PER_GROUP; k++)
+      {
+        this.cfg.notify_add ("group%d".printf (g), "key%d".printf (k),
+                             this.on_changed);
+      }
+    }
+
+    for (int i = 0; i < runs; i++)
+    {
+      KeyFile data = new KeyFile ();
+      Timer timer;
+
+      data.load_from_file (this.ini_path, KeyFileFlags.KEEP_COMMENTS);
+      data.set_integer ("group5", "key0", 1000 + i);
+      this.notify_counter = 0;
+      timer = new Timer ();
+      FileUtils.set_contents (this.ini_path, data.to_data ());
+      while (this.notify_counter == 0 && timer.elapsed () < 10.0)
+      {
+        ctx.iteration (false);
+      }
+      times[i] = timer.elapsed ();
+      // collect any extra notification from the same reload
+      spin (ctx, 0.25);
+      if (this.cfg.get_int ("group5", "key0") != 1000 + i)
+      {
+        critical ("The change was not reloaded.");
+      }
+      stdout.printf ("run %d: %.2f ms, %u notification(s)\n", i + 1,
+                     times[i] * 1000, this.notify_counter);
+    }
+
+    // insertion sort, to get the median
+    for (int i = 1; i < runs; i++)
+    {
+      double t = times[i];
+      int j = i;
+      for (; j > 0 && times[j - 1] > t; j--)
+      {
+        times[j] = times[j - 1];
+      }
+      times[j] = t;
+    }
+    stdout.printf ("%d keys, median reload: %.2f ms\n",
+                   GROUPS * KEYS_PER_GROUP, times[runs / 2] * 1000);
+  }
+
+  public static int
+  main (string[] args)
+  {
+    int runs = (args.length > 1) ? args[1].to_int () : 10;
+    string dir;
+
+    try
+    {
+      dir = Path.build_filename (Environment.get_tmp_dir (),
+                                 "%s-%s".printf (APP_NAME,
+                                                 Environment.get_user_name ()));
+      DirUtils.create_with_parents (dir, 0700);
+      // start from the schema defaults
+      FileUtils.unlink (Path.build_filename (dir, "desktop-agnostic",
+                                             "%s.ini".printf (APP_NAME)));
+      // must happen before GLib caches the user directories
+      Environment.set_variable ("XDG_CONFIG_HOME", dir, true);
+      Benchmark bench = new Benchmark (write_schema (dir));
+      if (bench.name () != "GKeyFile")
+      {
+        stdout.printf ("The %s backend is not covered by this benchmark.\n",
+                       bench.name ());
+        return 0;
+      }
+      bench.run (runs > 0 ? runs : 10);
+    }
+    catch (Error err)
+    {
+      critical ("Error: %s", err.message);
+      return 2;
+    }
+    return 0;
+  }
+}
+
+// vim: set et ts=2 sts=2 sw=2 ai cindent :
@@ -16,7 +16,10 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301  USA.
 
+import ConfigParser
+import gc
 import glib
+import os
 import time
 import unittest
 from desktopagnostic import config
@@ -135,6 +138,192 @@ class TestConfigClient(unittest.TestCase):
         self.client.notify_remove('misc', 'string', self.string_changed2)
         self.check_notify(ctx, 'Baz foo', 8)
 
+    def test_transaction(self):
+        ctx = self.ml.get_context()
+
+        self.client.notify_add('misc', 'string', self.string_changed)
+
+        self.client.begin_transaction()
+        self.client.set_string('misc', 'string', 'Foo bar baz')
+        self.client.set_int('numeric', 'integer', 42)
+        self.assertEqual(self.notify_counter, 0)
+        self.assertEqual(self.client.get_string('misc', 'string'),
+                         'Foo bar baz')
+        self.client.commit_transaction()
+        time.sleep(0.25)
+        while ctx.pending():
+            ctx.iteration()
+        self.assertEqual(self.notify_counter, 1)
+        self.check_values('numeric', 'integer', 42, 'int')
+
+        self.client.notify_remove('misc', 'string', self.string_changed)
+
+    def test_many(self):
+        values = {
+            ('numeric', 'integer'): 42,
+            ('misc', 'string'): 'Quux foo',
+            ('list', 'string'): ['Foo', 'Bar'],
+        }
+        self.client.set_many(values)
+        self.assertEqual(self.client.get_many(values.keys()), values)
+        for (group, key), value in values.iteritems():
+            self.assertEqual(self.client.get_value(group, key), value)
+
+    def test_get_group(self):
+        group = self.client.get_group('numeric')
+        self.assertEqual(sorted(group.keys()),
+                         ['boolean', 'float', 'integer'])
+        self.assertEqual(group['integer'], 3)
+        self.assertEqual(group['boolean'], True)
+
+
+class TestGKeyFileAutosave(unittest.TestCase):
+    '''
+    Tests how the GKeyFile backend writes and reloads its configuration
+    file. The schema sets an autosave delay of 200 ms and a threshold of 3
+    changes.
+    '''
+
+    def setUp(self):
+        # load the configuration backend, which registers its metadata keys
+        self.default_client = config.Client('../test-config.schema-ini')
+        self.ctx = glib.MainLoop().get_context()
+        self.notify_counter = 0
+        self.path = os.path.join(glib.get_user_config_dir(),
+                                 'desktop-agnostic',
+                                 'test-config-keyfile.ini')
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.client = config.Client('../test-config-keyfile.schema-ini')
+        if not os.path.exists(self.path):
+            self.skipTest('the configuration backend is not GKeyFile')
+        # let the backend create its file monitor
+        self.iterate(0.25)
+
+    def tearDown(self):
+        del self.client
+        gc.collect()
+
+    def iterate(self, seconds):
+        end = time.time() + seconds
+        while time.time() < end:
+            while self.ctx.pending():
+                self.ctx.iteration()
+            time.sleep(0.01)
+        while self.ctx.pending():
+            self.ctx.iteration()
+
+    def settle(self):
+        # long enough for the autosave delay and the file monitor events
+        self.iterate(2.0)
+
+    def count_saves(self):
+        # each save replaces the file, so it gets a new inode
+        inodes = set([os.stat(self.path).st_ino])
+        end = time.time() + 2.0
+        while time.time() < end:
+            while self.ctx.pending():
+                self.ctx.iteration()
+            inodes.add(os.stat(self.path).st_ino)
+            time.sleep(0.01)
+        return len(inodes) - 1
+
+    def saved_value(self, group, key):
+        parser = ConfigParser.RawConfigParser()
+        parser.read(self.path)
+        return parser.get(group, key)
+
+    def write_file(self, data):
+        f = open(self.path, 'w')
+        try:
+            f.write(data)
+        finally:
+            f.close()
+
+    def read_file(self):
+        f = open(self.path)
+        try:
+            return f.read()
+        finally:
+            f.close()
+
+    def changed(self, group, key, value):
+        self.notify_counter += 1
+
+    def test_autosave_delay(self):
+        self.client.set_int('numeric', 'a', 10)
+        self.assertEqual(self.saved_value('numeric', 'a'), '1')
+        self.settle()
+        self.assertEqual(self.saved_value('numeric', 'a'), '10')
+
+    def test_autosave_threshold(self):
+        self.client.set_int('numeric', 'a', 10)
+        self.client.set_int('numeric', 'b', 20)
+        self.assertEqual(self.saved_value('numeric', 'a'), '1')
+        # the third change reaches the threshold, and without a running main
+        # loop the file is written right away
+        self.client.set_int('numeric', 'c', 30)
+        self.assertEqual(self.saved_value('numeric', 'a'), '10')
+        self.assertEqual(self.saved_value('numeric', 'b'), '20')
+        self.assertEqual(self.saved_value('numeric', 'c'), '30')
+
+    def test_flush_on_dispose(self):
+        self.client.set_string('misc', 'string', 'Quux baz')
+        self.assertEqual(self.saved_value('misc', 'string'), 'Foo bar')
+        del self.client
+        gc.collect()
+        self.assertEqual(self.saved_value('misc', 'string'), 'Quux baz')
+        self.client = None
+
+    def test_own_write(self):
+        self.client.notify_add('numeric', 'a', self.changed)
+        self.client.set_int('numeric', 'a', 10)
+        self.settle()
+        self.assertEqual(self.saved_value('numeric', 'a'), '10')
+        self.assertEqual(self.client.get_int('numeric', 'a'), 10)
+        # only the local change is notified, not the reload of our own write
+        self.assertEqual(self.notify_counter, 1)
+        self.client.notify_remove('numeric', 'a', self.changed)
+
+    def test_reverted_edit(self):
+        self.client.set_int('numeric', 'a', 10)
+        self.settle()
+        original = self.read_file()
+        self.write_file(original.replace('a=10', 'a=20'))
+        self.settle()
+        self.assertEqual(self.client.get_int('numeric', 'a'), 20)
+        # the file is back to the data written by the backend itself
+        self.write_file(original)
+        self.settle()
+        self.assertEqual(self.client.get_int('numeric', 'a'), 10)
+
+    def test_external_change(self):
+        for key in ['a', 'b', 'c']:
+            self.client.notify_add('numeric', key, self.changed)
+        self.client.notify_add('misc', 'string', self.changed)
+        self.write_file(self.read_file().replace('b=2', 'b=5'))
+        self.assertTrue(self.count_saves() <= 1)
+        self.assertEqual(self.client.get_int('numeric', 'b'), 5)
+        self.assertEqual(self.notify_counter, 1)
+        self.assertEqual(self.saved_value('numeric', 'b'), '5')
+        for key in ['a', 'b', 'c']:
+            self.client.notify_remove('numeric', key, self.changed)
+        self.client.notify_remove('misc', 'string', self.changed)
+
+    def test_external_change_keeps_unsaved(self):
+        self.client.begin_transaction()
+        self.client.set_int('numeric', 'a', 10)
+        data = self.read_file()
+        self.write_file(data.replace('a=1', 'a=7').replace('b=2', 'b=5'))
+        self.settle()
+        # the local change has not been saved yet, so it wins
+        self.assertEqual(self.client.get_int('numeric', 'a'), 10)
+        self.assertEqual(self.client.get_int('numeric', 'b'), 5)
+        self.client.commit_transaction()
+        self.settle()
+        self.assertEqual(self.saved_value('numeric', 'a'), '10')
+        self.assertEqual(self.saved_value('numeric', 'b'), '5')
+
 # add the type-specific tests to the testcase
 for type_name, data in type_key_map.iteritems():
     methods = create_type_tests(type_name, *data)
@@ -64,6 +64,21 @@ class TestCase
     }
   }
 
+  void
+  on_string_changed_remove (string group, string key, Value value)
+  {
+    this.notify_counter++;
+    try
+    {
+      cfg.notify_remove (group, key, this.on_string_changed_remove);
+      cfg.notify_remove (group, key, this.on_string_changed);
+    }
+    catch (Error err)
+    {
+      critical ("Error: %s", err.message);
+    }
+  }
+
   bool
   array_equals (ValueArray expected, ValueArray actual) throws AssertionError
   {
@@ -355,6 +370,48 @@ class TestCase
     this.update_notify_value (ctx, "Baz foo", 8);
   }
 
+  void
+  test_notify_remove_during_dispatch () throws AssertionError, Error
+  {
+    unowned MainContext ctx = this.ml.get_context ();
+
+    this.notify_counter = 0;
+    cfg.notify_add ("misc", "string", this.on_string_changed_remove);
+    // removed by the first callback before its turn comes
+    cfg.notify_add ("misc", "string", this.on_string_changed);
+    this.update_notify_value (ctx, "Remove foo", 1);
+    this.update_notify_value (ctx, "Remove bar", 1);
+  }
+
+  void
+  test_notify_duplicates () throws AssertionError, Error
+  {
+    unowned MainContext ctx = this.ml.get_context ();
+
+    this.notify_counter = 0;
+    cfg.notify_add ("misc", "string", this.on_string_changed);
+    cfg.notify_add ("misc", "string", this.on_string_changed);
+    this.update_notify_value (ctx, "Twice foo", 2);
+    cfg.notify_remove ("misc", "string", this.on_string_changed);
+    this.update_notify_value (ctx, "Twice bar", 3);
+    cfg.notify_remove ("misc", "string", this.on_string_changed);
+    this.update_notify_value (ctx, "Twice baz", 3);
+    // removing a callback which is not registered anymore does nothing
+    cfg.notify_remove ("misc", "string", this.on_string_changed);
+    this.update_notify_value (ctx, "Twice quux", 3);
+  }
+
+  void
+  test_notify_without_listeners () throws AssertionError, Error
+  {
+    // the value of a key without callbacks is not retrieved, so notifying a
+    // nonexistent key is not an error
+    cfg.notify ("foo", "bar");
+    cfg.notify_add ("foo", "bar", this.on_string_changed);
+    cfg.notify_remove ("foo", "bar", this.on_string_changed);
+    cfg.notify ("foo", "bar");
+  }
+
   private static delegate void GetCfgFunc (Config.Backend cfg, string group, string key) throws Error;
 
   void
@@ -394,6 +451,9 @@ class TestCase
       test.test_set ();
       test.test_invalid ();
       test.test_notify ();
+      test.test_notify_remove_during_dispatch ();
+      test.test_notify_duplicates ();
+      test.test_notify_without_listeners ();
     }
     catch (AssertionError assertion)
     {
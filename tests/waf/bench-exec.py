@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2026 the libdesktop-agnostic developers
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301  USA.
+
+'''
+Launches 1000 trivial commands through Utils.exec_command, directly and
+through the fork server, first from a small process and then after growing
+the heap by SIZE megabytes to mimic a waf process holding a large build.
+
+Usage: python tests/waf/bench-exec.py [COMMANDS [SIZE]]
+'''
+
+import os
+import sys
+import tempfile
+import time
+
+TOP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, os.path.join(TOP, 'wafadmin'))
+sys.path.insert(0, os.path.join(TOP, 'wafadmin', 'Tools'))
+
+import Utils
+
+
+def bench(label, count, cmd, **kw):
+    t = time.time()
+    for i in xrange(count):
+        ret = Utils.exec_command(cmd, **kw)
+        assert ret == 0, 'the command %r failed' % cmd
+    print '%-32s %.3fs' % (label, time.time() - t)
+
+
+def run(count, heap):
+    log = tempfile.TemporaryFile()
+    try:
+        for server in (False, True):
+            Utils.fork_server = server
+            name = server and 'fork server' or 'direct'
+            bench('%s, %s, argv' % (name, heap), count, ['true'])
+            bench('%s, %s, shell' % (name, heap), count, 'true')
+            bench('%s, %s, logged' % (name, heap), count, ['echo', 'x'],
+                  log=log)
+    finally:
+        log.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    run(count, 'small heap')
+    ballast = [str(i) for i in xrange(size * 1024 * 1024 / 64)]
+    run(count, '%d MB heap' % size)
+    del ballast
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2026 the libdesktop-agnostic developers
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301  USA.
+
+'''
+Compares Node.ant_glob with the previous generator based implementation on
+a synthetic source tree of 50k files.
+
+Usage: python tests/waf/bench-glob.py [DIRS [FILES_PER_DIR]]
+'''
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+TOP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, os.path.join(TOP, 'wafadmin'))
+sys.path.insert(0, os.path.join(TOP, 'wafadmin', 'Tools'))
+
+import Build
+import Node
+import Utils
+
+PATTERNS = [
+    '**/*.c',
+    'mod1/*.h',
+    'mod2/sub0/*.vala',
+    '**/sub1/file1*',
+    ['**/*.c', '**/*.h'],
+]
+
+
+def old_ant_glob(self, *k, **kw):
+    '''The implementation of Node.ant_glob before the compiled matcher.'''
+    src = kw.get('src', 1)
+    bld = kw.get('bld', 1)
+    dir = kw.get('dir', 0)
+    excl = kw.get('excl', Node.exclude_regs)
+    incl = k and k[0] or kw.get('incl', '**')
+
+    def to_pat(s):
+        lst = Utils.to_list(s)
+        ret = []
+        for x in lst:
+            x = x.replace('//', '/')
+            if x.endswith('/'):
+                x += '**'
+            lst2 = x.split('/')
+            accu = []
+            for k in lst2:
+                if k == '**':
+                    accu.append(k)
+                else:
+                    k = k.replace('.', '[.]').replace('*', '.*')
+                    k = '^%s$' % k.replace('?', '.')
+                    accu.append(re.compile(k))
+            ret.append(accu)
+        return ret
+
+    def filtre(name, nn):
+        ret = []
+        for lst in nn:
+            if not lst:
+                pass
+            elif lst[0] == '**':
+                ret.append(lst)
+                if len(lst) > 1:
+                    if lst[1].match(name):
+                        ret.append(lst[2:])
+                else:
+                    ret.append([])
+            elif lst[0].match(name):
+                ret.append(lst[1:])
+        return ret
+
+    def accept(name, pats):
+        nacc = filtre(name, pats[0])
+        nrej = filtre(name, pats[1])
+        if [] in nrej:
+            nacc = []
+        return [nacc, nrej]
+
+    def ant_iter(nodi, maxdepth=25, pats=[]):
+        nodi.__class__.bld.rescan(nodi)
+        for name in nodi.__class__.bld.cache_dir_contents[nodi.id]:
+            npats = accept(name, pats)
+            if npats and npats[0]:
+                accepted = [] in npats[0]
+                node = nodi.find_resource(name)
+                if node and accepted:
+                    if src and node.id & 3 == Node.FILE:
+                        yield node
+                else:
+                    node = nodi.find_dir(name)
+                    if node and node.id != nodi.__class__.bld.bldnode.id:
+                        if accepted and dir:
+                            yield node
+                        if maxdepth:
+                            for k in ant_iter(node, maxdepth=maxdepth - 1,
+                                              pats=npats):
+                                yield k
+        if bld:
+            for node in nodi.childs.values():
+                if node.id == nodi.__class__.bld.bldnode.id:
+                    continue
+                if node.id & 3 == Node.BUILD:
+                    npats = accept(node.name, pats)
+                    if npats and npats[0] and [] in npats[0]:
+                        yield node
+
+    ret = [x for x in ant_iter(self, pats=[to_pat(incl), to_pat(excl)])]
+    if kw.get('flat', True):
+        return ' '.join([x.relpath_gen(self) for x in ret])
+    return ret
+
+
+def make_tree(top, dirs, files):
+    exts = ['.c', '.h', '.vala', '.txt']
+    for i in xrange(dirs):
+        path = os.path.join(top, 'mod%d' % (i % 20), 'sub%d' % (i / 20))
+        os.makedirs(path)
+        for j in xrange(files):
+            f = open(os.path.join(path, 'file%d%s' % (j, exts[j % 4])), 'w')
+            f.close()
+
+
+def new_context(top):
+    bld = Build.BuildContext()
+    bld.load_dirs(top, os.path.join(top, 'build'), load_cache=0)
+    return bld
+
+
+def bench(label, fun, top):
+    # a fresh context each time, so that both pay for reading the tree
+    bld = new_context(top)
+    t = time.time()
+    ret = [sorted(fun(bld.srcnode, pat).split()) for pat in PATTERNS]
+    first = time.time() - t
+    t = time.time()
+    for pat in PATTERNS:
+        fun(bld.srcnode, pat)
+    print '%-8s first pass %.3fs, cached tree %.3fs' % (label, first,
+                                                       time.time() - t)
+    return ret
+
+
+def main():
+    dirs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    top = tempfile.mkdtemp()
+    try:
+        make_tree(top, dirs, files)
+        print '%d files' % (dirs * files)
+        old = bench('old', old_ant_glob, top)
+        new = bench('new', Node.Node.ant_glob, top)
+        assert old == new, 'the results differ'
+    finally:
+        shutil.rmtree(top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2026 the libdesktop-agnostic developers
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301  USA.
+
+'''
+Builds a synthetic tree of 100k nodes with the bundled waf and reports the
+memory it takes, the size of its pickle and of the build data segments.
+
+Usage: python tests/waf/bench-nodes.py [DIRS [FILES_PER_DIR]]
+'''
+
+import cPickle
+import gc
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+TOP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, os.path.join(TOP, 'wafadmin'))
+sys.path.insert(0, os.path.join(TOP, 'wafadmin', 'Tools'))
+
+import Build
+import Node
+
+
+def rss():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def make_tree(bld, dirs, files):
+    Node.Nodu = bld.node_class
+    bld.root = Node.Nodu('', None, Node.DIR)
+    bld.srcnode = bld.root.ensure_dir_node_from_path(bld.bdir + '/src')
+    bld.bldnode = bld.root.ensure_dir_node_from_path(bld.bdir + '/build')
+    bld.node_sigs = {0: {}}
+    names = ['file%d.c' % j for j in xrange(files)]
+    for i in xrange(dirs):
+        d = Node.Nodu('dir%d' % i, bld.srcnode, Node.DIR)
+        for j in xrange(files):
+            # build the name again so that only interning can share it
+            n = Node.Nodu(''.join(names[j]), d, Node.FILE)
+            bld.node_sigs[0][n.id] = '%016d' % n.id
+
+
+def main():
+    dirs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    tmp = tempfile.mkdtemp()
+    try:
+        gc.collect()
+        before = rss()
+        bld = Build.BuildContext()
+        bld.bdir = bld.cachedir = tmp
+        t = time.time()
+        make_tree(bld, dirs, files)
+        print 'nodes:        %d' % (bld.id_nodes / 4)
+        print 'create:       %.3fs' % (time.time() - t)
+        print 'memory:       %.1f MiB' % ((rss() - before) / 1024.0)
+        t = time.time()
+        txt = cPickle.dumps(bld.root, -1)
+        print 'pickle:       %.3fs, %.1f MiB' % (time.time() - t,
+                                              len(txt) / 1048576.0)
+        t = time.time()
+        bld.save()
+        print 'save:         %.3fs' % (time.time() - t)
+        size = sum([os.path.getsize(os.path.join(tmp, x))
+                    for x in os.listdir(tmp) if x.startswith('.wafpickle')])
+        print 'segments:     %.1f MiB' % (size / 1048576.0)
+        bld = Build.BuildContext()
+        bld.bdir = bld.cachedir = tmp
+        t = time.time()
+        bld.load()
+        print 'load:         %.3fs' % (time.time() - t)
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
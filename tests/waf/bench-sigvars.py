@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2026 the libdesktop-agnostic developers
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301  USA.
+
+'''
+Compares the variable signatures of thousands of tasks sharing a few
+environments: the previous cache keyed on id(env), and the digests kept by
+the environments.
+
+Usage: python tests/waf/bench-sigvars.py [TASKS [ENVS]]
+'''
+
+import os
+import sys
+import time
+
+TOP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, os.path.join(TOP, 'wafadmin'))
+
+import Environment
+import Utils
+
+# the variables of the cc task, see wafadmin/Tools/cc.py
+VARS = ['CC', 'CCFLAGS', 'CPPFLAGS', '_CCINCFLAGS', '_CCDEFFLAGS',
+        'CC_SRC_F', 'CC_TGT_F', 'CCDEPS']
+
+
+def old_hash_env_vars(cache, env, vars_lst):
+    idx = str(id(env)) + str(vars_lst)
+    try:
+        return cache[idx]
+    except KeyError:
+        pass
+    lst = [str(env[a]) for a in vars_lst]
+    ret = Utils.h_list(lst)
+    cache[idx] = ret
+    return ret
+
+
+def make_envs(count):
+    base = Environment.Environment()
+    base['CC'] = ['/usr/bin/gcc']
+    base['CCFLAGS'] = ['-O2', '-g', '-Wall', '-fPIC']
+    base['CC_SRC_F'] = ''
+    base['CC_TGT_F'] = ['-c', '-o', '']
+    for i in xrange(200):
+        base['VAR_%d' % i] = ['value %d' % i] * 5
+    envs = []
+    for i in xrange(count):
+        env = base.copy()
+        env.append_value('_CCINCFLAGS', ['-I../src%d' % i, '-Idefault'])
+        env.append_value('_CCDEFFLAGS', ['-DHAVE_CONFIG_H', '-DMOD=%d' % i])
+        envs.append(env)
+    return envs
+
+
+def main():
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    envs = make_envs(count)
+    # every task asks for its signature several times during a build
+    order = [envs[i % count] for i in xrange(tasks)] * 3
+
+    cache = {}
+    t = time.time()
+    old = [old_hash_env_vars(cache, env, VARS) for env in order]
+    print 'id() keyed cache:     %.4fs' % (time.time() - t)
+
+    t = time.time()
+    new = [env.hash_vars(VARS) for env in order]
+    print 'environment digests:  %.4fs' % (time.time() - t)
+    print '%d tasks, %d environments, %d distinct signatures' % (
+        tasks, count, len(set(new)))
+    assert len(set(old)) == len(set(new))
+
+
+if __name__ == '__main__':
+    main()
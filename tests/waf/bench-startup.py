@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2026 the libdesktop-agnostic developers
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301  USA.
+
+'''
+Measures the startup time of waf on a small C project which configures the
+same tools as libdesktop-agnostic: "waf --version", a no-op "waf build" and
+"waf install". The build and install commands run twice: once with the
+lazy tool index written by "waf configure", and once with the index removed
+from build.config.py, which makes waf import every configured tool up front.
+
+Usage: python tests/waf/bench-startup.py [RUNS]
+'''
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+TOP = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+WAF = os.path.join(TOP, 'waf')
+
+WSCRIPT = '''
+APPNAME = 'bench'
+VERSION = '1.0'
+srcdir = '.'
+blddir = 'build'
+
+
+def set_options(opt):
+    opt.tool_options('compiler_cc')
+
+
+def configure(conf):
+    conf.check_tool('compiler_cc misc gnu_dirs')
+    # optional, depending on what is installed on this machine
+    for tool in ['python', 'glib2', 'gnome', 'intltool', 'vala']:
+        try:
+            conf.check_tool(tool)
+        except Exception:
+            pass
+
+
+def build(bld):
+    bld.new_task_gen(features='cc cprogram', source='main.c',
+                     target='bench')
+    bld.new_task_gen(features='subst', source='bench.pc.in',
+                     target='bench.pc', dict={'VERSION': VERSION},
+                     install_path='${LIBDIR}/pkgconfig')
+'''
+
+
+def waf(top, *args):
+    env = dict(os.environ, WAFDIR=TOP)
+    out = open(os.devnull, 'w')
+    try:
+        t = time.time()
+        ret = subprocess.call([sys.executable, WAF] + list(args), cwd=top,
+                              env=env, stdout=out, stderr=out)
+        elapsed = time.time() - t
+    finally:
+        out.close()
+    if ret:
+        raise SystemExit('waf %s failed in %s' % (' '.join(args), top))
+    return elapsed
+
+
+def bench(label, top, runs, *args):
+    times = sorted([waf(top, *args) for i in xrange(runs)])
+    print '%-22s median %.3fs, best %.3fs' % (label, times[len(times) / 2],
+                                             times[0])
+
+
+def strip_lazy_index(top):
+    path = os.path.join(top, 'build', 'c4che', 'build.config.py')
+    lines = open(path).readlines()
+    f = open(path, 'w')
+    try:
+        for line in lines:
+            if not line.split(' = ')[0] in ('lazy', 'lazy_paths', 'eager'):
+                f.write(line)
+    finally:
+        f.close()
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    top = tempfile.mkdtemp()
+    try:
+        open(os.path.join(top, 'wscript'), 'w').write(WSCRIPT)
+        open(os.path.join(top, 'main.c'), 'w').write(
+            'int main() { return 0; }\n')
+        open(os.path.join(top, 'bench.pc.in'), 'w').write(
+            'Version: @VERSION@\n')
+        dest = '--destdir=' + os.path.join(top, 'inst')
+        waf(top, 'configure')
+        waf(top, 'build', 'install', dest)
+
+        bench('waf --version', top, runs, '--version')
+        bench('no-op build (lazy)', top, runs, 'build')
+        bench('install (lazy)', top, runs, 'install', dest)
+        strip_lazy_index(top)
+        bench('no-op build (eager)', top, runs, 'build')
+        bench('install (eager)', top, runs, 'install', dest)
+    finally:
+        shutil.rmtree(top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2026 the libdesktop-agnostic developers
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA 02110-1301  USA.
+
+'''
+Builds two checkouts of a small C project with the gccdeps tool (what
+"--enable-gcc-deps" configures) and a shared WAFCACHE. The second checkout
+restores some of its objects from the cache, so gcc never writes their .d
+files; the build must still succeed, be a no-op when run again and rebuild
+the objects whose headers change.
+
+Usage: python tests/waf/test-gccdeps-cache.py
+'''
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+TOP = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+WAF = os.path.join(TOP, 'waf')
+
+WSCRIPT = '''
+srcdir = '.'
+blddir = 'build'
+
+
+def set_options(opt):
+    opt.tool_options('compiler_cc')
+
+
+def configure(conf):
+    conf.check_tool('compiler_cc gccdeps')
+
+
+def build(bld):
+    bld.new_task_gen(features='cc cprogram', source='main.c util.c',
+                     target='app')
+'''
+
+SOURCES = {
+    'main.c': '#include "h.h"\nint util(void);\n'
+              'int main() { return util() - VALUE; }\n',
+    'util.c': 'int util(void) { return 1; }\n',
+    'h.h': '#define VALUE 1\n',
+}
+
+
+def write(top, name, txt):
+    f = open(os.path.join(top, name), 'w')
+    try:
+        f.write(txt)
+    finally:
+        f.close()
+
+
+def waf(top, cache, *args):
+    env = dict(os.environ, WAFDIR=TOP, WAFCACHE=cache)
+    proc = subprocess.Popen([sys.executable, WAF] + list(args), cwd=top,
+                            env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT)
+    out = proc.communicate()[0]
+    if proc.returncode:
+        raise SystemExit('waf %s failed in %s:\n%s' % (' '.join(args), top,
+                                                       out))
+    return out
+
+
+def executed(out):
+    return sorted([line.split()[2] for line in out.splitlines()
+                   if ' cc: ' in line])
+
+
+def restored(out):
+    return sorted([line.split()[-1].strip("'") for line in out.splitlines()
+                   if line.startswith('restoring from cache')])
+
+
+def checkout(base, name, cache):
+    top = os.path.join(base, name)
+    os.mkdir(top)
+    write(top, 'wscript', WSCRIPT)
+    for (name, txt) in SOURCES.items():
+        write(top, name, txt)
+    waf(top, cache, 'configure')
+    return top
+
+
+def main():
+    base = tempfile.mkdtemp()
+    try:
+        cache = os.path.join(base, 'cache')
+        os.mkdir(cache)
+
+        first = checkout(base, 'first', cache)
+        out = waf(first, cache, 'build')
+        assert executed(out) == ['main.c', 'util.c'], out
+
+        second = checkout(base, 'second', cache)
+        out = waf(second, cache, 'build')
+        assert restored(out) == ['default/app', 'default/util_1.o'], out
+        assert not os.path.exists(os.path.join(second, 'build', 'default',
+                                               'util_1.d'))
+
+        out = waf(second, cache, 'build')
+        assert executed(out) == [], out
+
+        write(second, 'h.h', '#define VALUE 2\n')
+        out = waf(second, cache, 'build')
+        assert executed(out) == ['main.c'], out
+    finally:
+        shutil.rmtree(base)
+    print 'ok'
+
+
+if __name__ == '__main__':
+    main()
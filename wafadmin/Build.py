@@ -2,14 +2,28 @@
 # encoding: utf-8
 import sys
 if sys.hexversion < 0x020400f0: from sets import Set as set
-import os,sys,errno,re,glob,gc,datetime,shutil
+import os,sys,errno,re,glob,gc,datetime,shutil,time,stat,threading
+from array import array
+try:from Queue import Queue
+except ImportError:from queue import Queue
+try:from cStringIO import StringIO
+except ImportError:from io import BytesIO as StringIO
+try:intern
+except NameError:from sys import intern
 try:import cPickle
 except:import pickle as cPickle
 import Runner,TaskGen,Node,Scripting,Utils,Environment,Task,Logs,Options
-from Logs import debug,error,info
+from Logs import debug,error,info,warn
 from Constants import*
-SAVED_ATTRS='root srcnode bldnode node_sigs node_deps raw_deps task_sigs id_nodes'.split()
+SAVED_ATTRS='root srcnode bldnode node_sigs node_deps raw_deps task_sigs id_nodes node_stats task_durations dep_index parse_lines'.split()
+SEGMENTS='nodes node_sigs task_sigs node_deps raw_deps node_stats task_durations dep_index parse_lines'.split()
+LAZY_SEGMENTS='raw_deps task_durations dep_index parse_lines'.split()
+NODE_SEGMENTS='node_deps dep_index'.split()
+INDEX_SEGMENT='index'
 bld=None
+def json_quote(s):
+	s=s.replace('\\','\\\\').replace('"','\\"')
+	return'"%s"'%re.sub('[\x00-\x1f]',lambda m:'\\u%04x'%ord(m.group(0)),s)
 class BuildError(Utils.WafError):
 	def __init__(self,b=None,t=[]):
 		self.bld=b
@@ -36,19 +50,29 @@ class BuildContext(Utils.Context):
 		self.cache_node_abspath={}
 		self.cache_scanned_folders={}
 		self.uninstall=[]
-		for v in'cache_node_abspath task_sigs node_deps raw_deps node_sigs'.split():
+		self.installed=[]
+		self.install_queue=None
+		self.install_count=0
+		self.install_errors=[]
+		self.install_devs={}
+		for v in'cache_node_abspath task_sigs node_deps raw_deps node_sigs node_stats task_durations dep_index parse_lines'.split():
 			var={}
 			setattr(self,v,var)
 		self.cache_dir_contents={}
 		self.all_task_gen=[]
 		self.task_gen_cache_names={}
-		self.cache_sig_vars={}
+		self.stats_changed=False
+		self.cache_stored=[]
+		self.lazy={}
+		self.seg_sigs={}
+		self.seg_gens={}
+		self.generation=0
 		self.log=None
 		self.root=None
 		self.srcnode=None
 		self.bldnode=None
 		class node_class(Node.Node):
-			pass
+			__slots__=()
 		self.node_class=node_class
 		self.node_class.__module__="Node"
 		self.node_class.__name__="Nodu"
@@ -64,42 +88,217 @@ class BuildContext(Utils.Context):
 		else:
 			if env['version']<HEXVERSION:
 				raise Utils.WafError('Version mismatch! reconfigure the project')
-			for t in env['tools']:
+			tools=env['tools']
+			if env['lazy']:
+				Utils.lazy_index.update(env['lazy'])
+				Utils.lazy_paths.update(env['lazy_paths'])
+				tools=[t for t in tools if t['tool']in env['eager']]
+			for t in tools:
 				self.setup(**t)
+		gc.disable()
+		Node.Nodu=self.node_class
+		self.lazy={}
+		self.seg_sigs={}
+		self.seg_gens={}
+		self.generation=0
 		try:
-			gc.disable()
-			f=data=None
-			Node.Nodu=self.node_class
-			try:
-				f=open(os.path.join(self.bdir,DBFILE),'rb')
-			except(IOError,EOFError):
-				pass
 			try:
-				if f:data=cPickle.load(f)
-			except AttributeError:
+				f=open(self.segment_path(INDEX_SEGMENT),'rb')
+				try:
+					(self.generation,self.seg_gens)=cPickle.load(f)
+				finally:
+					f.close()
+				data=self.load_segment('nodes')
+				self.load_nodes(data)
+				for x in SEGMENTS[1:]:
+					if x in LAZY_SEGMENTS:
+						self.open_segment(x).close()
+						self.lazy[x]=True
+						delattr(self,x)
+					else:
+						setattr(self,x,self.load_segment(x))
+			except(IOError,OSError,EOFError,ValueError,KeyError,IndexError,AttributeError,TypeError,cPickle.UnpicklingError):
 				if Logs.verbose>1:raise
-			if data:
-				for x in SAVED_ATTRS:setattr(self,x,data[x])
-			else:
 				debug('build: Build cache loading failed')
+				self.lazy={}
+				self.seg_sigs={}
+				self.seg_gens={}
+				self.generation=0
+				self.root=self.srcnode=self.bldnode=None
+				self.id_nodes=0
+				for x in SEGMENTS[1:]:setattr(self,x,{})
+		finally:
+			gc.enable()
+	def __getattr__(self,name):
+		try:
+			del self.__dict__['lazy'][name]
+		except KeyError:
+			raise AttributeError(name)
+		gc.disable()
+		try:
+			try:
+				val=self.load_segment(name)
+			except(IOError,OSError,EOFError,ValueError,KeyError,IndexError,AttributeError,TypeError,cPickle.UnpicklingError):
+				debug('build: could not load %s'%name)
+				val={}
 		finally:
-			if f:f.close()
 			gc.enable()
+		setattr(self,name,val)
+		return val
+	def segment_path(self,name):
+		return os.path.join(self.bdir,'%s.%s'%(DBFILE,name))
+	def open_segment(self,name):
+		f=open(self.segment_path(name),'rb')
+		try:
+			if int(f.readline())!=self.seg_gens[name]:
+				raise ValueError('%s was not saved with the other segments'%name)
+		except:
+			f.close()
+			raise
+		return f
+	def load_segment(self,name):
+		f=self.open_segment(name)
+		try:
+			txt=f.read()
+		finally:
+			f.close()
+		self.seg_sigs[name]=Utils.md5(txt).digest()
+		if name=='node_sigs':
+			ret={}
+			for(variant,k,v)in cPickle.loads(txt):
+				if k is None:
+					ret[variant]=v
+				else:
+					keys=array('l')
+					keys.fromstring(k)
+					ret[variant]=dict(zip(keys,[v[i:i+16]for i in xrange(0,len(v),16)]))
+			return ret
+		if name in NODE_SEGMENTS:
+			idx={}
+			stack=[self.root]
+			while stack:
+				node=stack.pop()
+				idx[node.id]=node
+				childs=getattr(node,'childs',None)
+				if childs:stack.extend(childs.values())
+			u=cPickle.Unpickler(StringIO(txt))
+			u.persistent_load=idx.__getitem__
+			return u.load()
+		return cPickle.loads(txt)
+	def load_nodes(self,data):
+		(self.id_nodes,src,bld,names,parents,ids)=data
+		names=[intern(x)for x in names.split('\0')]
+		lst=array('l')
+		lst.fromstring(parents)
+		parents=lst
+		lst=array('l')
+		lst.fromstring(ids)
+		ids=lst
+		cls=self.node_class
+		new=cls.__new__
+		nodes=[]
+		app=nodes.append
+		for i in xrange(len(ids)):
+			node=new(cls)
+			node.name=name=names[i]
+			node.id=ids[i]
+			if node.id&3==Node.DIR:node.childs={}
+			p=parents[i]
+			if p<0:
+				node.parent=None
+			else:
+				parent=node.parent=nodes[p]
+				try:
+					parent.childs[name]=node
+				except AttributeError:
+					parent.childs={name:node}
+			app(node)
+		self.root=nodes[0]
+		self.srcnode=nodes[src]
+		self.bldnode=nodes[bld]
+	def dump_nodes(self):
+		names=[]
+		parents=array('l')
+		ids=array('l')
+		pos={}
+		stack=[(self.root,-1)]
+		while stack:
+			(node,p)=stack.pop()
+			pos[node.id]=len(ids)
+			names.append(node.name)
+			parents.append(p)
+			ids.append(node.id)
+			childs=getattr(node,'childs',None)
+			if childs:
+				i=pos[node.id]
+				stack.extend([(x,i)for x in childs.values()])
+		return(self.id_nodes,pos[self.srcnode.id],pos[self.bldnode.id],'\0'.join(names),parents.tostring(),ids.tostring())
+	def dump_segment(self,name):
+		if name=='nodes':
+			return cPickle.dumps(self.dump_nodes(),-1)
+		if name=='node_sigs':
+			lst=[]
+			for(variant,dct)in self.node_sigs.items():
+				keys=array('l',dct.keys())
+				vals=''.join(dct.values())
+				if len(vals)==16*len(keys):
+					lst.append((variant,keys.tostring(),vals))
+				else:
+					lst.append((variant,None,dct))
+			return cPickle.dumps(lst,-1)
+		if name in NODE_SEGMENTS:
+			f=StringIO()
+			p=cPickle.Pickler(f,-1)
+			def persistent_id(obj):
+				if isinstance(obj,Node.Node):return obj.id
+				return None
+			p.persistent_id=persistent_id
+			p.dump(getattr(self,name))
+			return f.getvalue()
+		return cPickle.dumps(getattr(self,name),-1)
 	def save(self):
 		gc.disable()
-		self.root.__class__.bld=None
-		Node.Nodu=self.node_class
-		db=os.path.join(self.bdir,DBFILE)
-		file=open(db+'.tmp','wb')
-		data={}
-		for x in SAVED_ATTRS:data[x]=getattr(self,x)
-		cPickle.dump(data,file,-1)
-		file.close()
-		try:os.unlink(db)
-		except OSError:pass
-		os.rename(db+'.tmp',db)
-		self.root.__class__.bld=self
-		gc.enable()
+		try:
+			sigs=set([])
+			ids=set([])
+			for x in self.node_sigs.values():
+				sigs.update(x.values())
+				ids.update(x.keys())
+			if not self.lazy.get('parse_lines',None):
+				for x in list(self.parse_lines.keys()):
+					if not x in sigs:
+						del self.parse_lines[x]
+			if not self.lazy.get('dep_index',None):
+				for x in list(self.dep_index.keys()):
+					if not x[0]in ids:
+						del self.dep_index[x]
+			gen=self.generation+1
+			for x in SEGMENTS:
+				if self.lazy.get(x,None):continue
+				txt=self.dump_segment(x)
+				sig=Utils.md5(txt).digest()
+				if self.seg_sigs.get(x,None)==sig:continue
+				db=self.segment_path(x)
+				f=open(db+'.tmp','wb')
+				try:
+					f.write('%d\n'%gen)
+					f.write(txt)
+				finally:
+					f.close()
+				os.rename(db+'.tmp',db)
+				self.seg_sigs[x]=sig
+				self.seg_gens[x]=gen
+			if gen in self.seg_gens.values():
+				db=self.segment_path(INDEX_SEGMENT)
+				f=open(db+'.tmp','wb')
+				try:
+					cPickle.dump((gen,self.seg_gens),f,-1)
+				finally:
+					f.close()
+				os.rename(db+'.tmp',db)
+				self.generation=gen
+		finally:
+			gc.enable()
 	def clean(self):
 		debug('build: clean called')
 		precious=set([])
@@ -121,7 +320,8 @@ class BuildContext(Utils.Context):
 						except OSError:pass
 					node.childs.__delitem__(x)
 		clean_rec(self.srcnode)
-		for v in'node_sigs node_deps task_sigs raw_deps cache_node_abspath'.split():
+		for v in'node_sigs node_deps task_sigs raw_deps cache_node_abspath node_stats dep_index parse_lines'.split():
+			self.lazy.pop(v,None)
 			setattr(self,v,{})
 	def compile(self):
 		debug('build: compile called')
@@ -148,33 +348,125 @@ class BuildContext(Utils.Context):
 				raise
 			else:
 				dw()
-				if self.generator.consumers:
+				if self.generator.consumers or self.stats_changed:
 					self.save()
+			if self.cache_stored:
+				Task.trim_cache(sum(self.cache_stored))
+			if self.generator.consumers:
+				self.save_times()
+				if Options.options.profile_build:
+					self.profile_report()
 			if self.generator.error:
 				raise BuildError(self,self.task_manager.tasks_done)
 		finally:
 			os.chdir(back)
+	def save_times(self):
+		variants={}
+		for tsk in self.task_manager.tasks_done:
+			if getattr(tsk,'timing',None)and hasattr(tsk,'unique_id'):
+				variants.setdefault(tsk.env.variant(),[]).append(tsk)
+		for variant in variants:
+			db=os.path.join(self.bdir,'%s.%s'%(TIMES_FILE,variant))
+			data={}
+			try:
+				f=open(db,'rb')
+				try:data=cPickle.load(f)
+				finally:f.close()
+			except(IOError,OSError,EOFError,cPickle.UnpicklingError):
+				pass
+			for tsk in variants[variant]:
+				(start,end,cpu,wait,slot)=tsk.timing
+				lst=data.setdefault(tsk.unique_id(),[])
+				lst.append((end-start,cpu,wait))
+				del lst[:-TIMES_HISTORY]
+			try:
+				f=open(db+'.tmp','wb')
+				try:cPickle.dump(data,f,-1)
+				finally:f.close()
+				os.rename(db+'.tmp',db)
+			except(IOError,OSError):
+				warn('could not save the task times in %r'%db)
+	def load_times(self,variant):
+		try:
+			f=open(os.path.join(self.bdir,'%s.%s'%(TIMES_FILE,variant)),'rb')
+		except(IOError,OSError):
+			return{}
+		try:
+			try:
+				return cPickle.load(f)
+			except(EOFError,cPickle.UnpicklingError):
+				return{}
+		finally:
+			f.close()
+	def profile_report(self):
+		tasks=[x for x in self.task_manager.tasks_done if getattr(x,'timing',None)]
+		if not tasks:
+			info('profile: no task was executed')
+			return
+		begin=min([x.timing[0]for x in tasks])
+		total=max([x.timing[1]for x in tasks])-begin or 1e-9
+		history={}
+		lst=[(x.timing[1]-x.timing[0],i,x)for(i,x)in enumerate(tasks)]
+		lst.sort()
+		lst.reverse()
+		buf=['Slowest tasks (wall, cpu of the child processes, wait in queue, mean wall over the previous builds):']
+		for(wall,i,tsk)in lst[:PROFILE_TOP]:
+			mean=''
+			if hasattr(tsk,'unique_id'):
+				variant=tsk.env.variant()
+				if not variant in history:history[variant]=self.load_times(variant)
+				old=history[variant].get(tsk.unique_id(),[])[:-1]
+				if old:mean='%.3fs'%(sum([x[0]for x in old])/len(old))
+			buf.append('  %8.3fs %8.3fs %8.3fs %8s  %s'%(wall,tsk.timing[2],tsk.timing[3],mean,str(tsk).strip()))
+		busy=Utils.DefaultDict(float)
+		count=Utils.DefaultDict(int)
+		for x in tasks:
+			busy[x.timing[4]]+=x.timing[1]-x.timing[0]
+			count[x.timing[4]]+=1
+		buf.append('Worker usage (-j%d, %.3fs from the first to the last task):'%(self.generator.numjobs,total))
+		for i in xrange(self.generator.numjobs):
+			buf.append('  slot %d: %5.1f%% busy, %d tasks'%(i,100.*busy[i]/total,count[i]))
+		cmds=[x.cmd_time for x in tasks if hasattr(x,'cmd_time')]
+		if cmds:
+			buf.append('Command construction: %.3fs for %d tasks, %.1fus per task'%(sum(cmds),len(cmds),1e6*sum(cmds)/len(cmds)))
+		trace=os.path.join(self.bdir,PROFILE_TRACE)
+		events=[]
+		for x in tasks:
+			(start,end,cpu,wait,slot)=x.timing
+			events.append('{"name": %s, "cat": %s, "ph": "X", "pid": 1, "tid": %d, "ts": %d, "dur": %d, "args": {"cpu": %.6f, "wait": %.6f, "cmd": %.6f}}'%(json_quote(str(x).strip()),json_quote(x.__class__.__name__),slot,int((start-begin)*1e6),int((end-start)*1e6),cpu,wait,getattr(x,'cmd_time',0.0)))
+		f=open(trace,'w')
+		try:
+			f.write('{"traceEvents": [\n%s\n]}\n'%',\n'.join(events))
+		finally:
+			f.close()
+		buf.append('Trace events written to %s'%trace)
+		info('\n'.join(buf))
 	def install(self):
 		debug('build: install called')
 		self.flush()
+		if self.is_install>0:
+			self.wait_install()
+			self.save_install_manifest()
 		if self.is_install<0:
-			lst=[]
-			for x in self.uninstall:
-				dir=os.path.dirname(x)
-				if not dir in lst:lst.append(dir)
-			lst.sort()
-			lst.reverse()
-			nlst=[]
-			for y in lst:
-				x=y
-				while len(x)>4:
-					if not x in nlst:nlst.append(x)
-					x=os.path.dirname(x)
-			nlst.sort()
-			nlst.reverse()
-			for x in nlst:
-				try:os.rmdir(x)
-				except OSError:pass
+			self.remove_install_dirs()
+	def remove_install_dirs(self):
+		lst=[]
+		for x in self.uninstall:
+			dir=os.path.dirname(x)
+			if not dir in lst:lst.append(dir)
+		lst.sort()
+		lst.reverse()
+		nlst=[]
+		for y in lst:
+			x=y
+			while len(x)>4:
+				if not x in nlst:nlst.append(x)
+				x=os.path.dirname(x)
+		nlst.sort()
+		nlst.reverse()
+		for x in nlst:
+			try:os.rmdir(x)
+			except OSError:pass
 	def new_task_gen(self,*k,**kw):
 		kw['bld']=self
 		if len(k)==0:
@@ -182,7 +474,11 @@ class BuildContext(Utils.Context):
 		else:
 			cls_name=k[0]
 			try:cls=TaskGen.task_gen.classes[cls_name]
-			except KeyError:raise Utils.WscriptError('%s is not a valid task generator -> %s'%(cls_name,[x for x in TaskGen.task_gen.classes]))
+			except KeyError:
+				if not Utils.load_lazy('class',cls_name):
+					Utils.load_all_lazy()
+				try:cls=TaskGen.task_gen.classes[cls_name]
+				except KeyError:raise Utils.WscriptError('%s is not a valid task generator -> %s'%(cls_name,[x for x in TaskGen.task_gen.classes]))
 			ret=cls(*k,**kw)
 		return ret
 	def load_envs(self):
@@ -303,7 +599,7 @@ class BuildContext(Utils.Context):
 			node=parent_node.childs[x]
 			if node.id&3==Node.DIR:continue
 			try:
-				cache[node.id]=Utils.h_file(parent_path+os.sep+node.name)
+				cache[node.id]=self.hash_file(node.id,parent_path+os.sep+node.name)
 			except IOError:
 				raise Utils.WafError("The file %s is not readable or has become a dir"%node.abspath())
 		to_remove=node_names-lst
@@ -317,6 +613,24 @@ class BuildContext(Utils.Context):
 					else:
 						continue
 				self.remove_node(nd)
+	def hash_file(self,nid,path):
+		if getattr(Options.options,'hash_mode','stat')!='stat':
+			return Utils.h_file(path)
+		try:
+			st=os.stat(path)
+		except OSError:
+			raise IOError('cannot stat %r'%path)
+		key=(st.st_mtime,st.st_size,st.st_ino)
+		prev=self.node_stats.get(nid,None)
+		if prev and prev[0]==key:
+			return prev[1]
+		ret=Utils.h_file(path)
+		if time.time()-st.st_mtime>1:
+			self.node_stats[nid]=(key,ret)
+			self.stats_changed=True
+		elif prev:
+			del self.node_stats[nid]
+		return ret
 	def remove_node(self,node):
 		if node.id&3==Node.DIR:
 			for x in node.childs.values():
@@ -326,6 +640,8 @@ class BuildContext(Utils.Context):
 		elif node.id&3==Node.FILE:
 			if node.id in self.node_sigs[0]:
 				self.node_sigs[0].__delitem__(node.id)
+			if node.id in self.node_stats:
+				self.node_stats.__delitem__(node.id)
 			node.parent.childs.__delitem__(node.name)
 		else:
 			for variant in self.lst_variants:
@@ -374,14 +690,7 @@ class BuildContext(Utils.Context):
 	def set_group(self,*k,**kw):
 		self.task_manager.set_group(*k,**kw)
 	def hash_env_vars(self,env,vars_lst):
-		idx=str(id(env))+str(vars_lst)
-		try:return self.cache_sig_vars[idx]
-		except KeyError:pass
-		lst=[str(env[a])for a in vars_lst]
-		ret=Utils.h_list(lst)
-		debug("envhash: %r %r"%(ret,lst))
-		self.cache_sig_vars[idx]=ret
-		return ret
+		return env.hash_vars(vars_lst)
 	def name_to_obj(self,name,env):
 		cache=self.task_gen_cache_names
 		if not cache:
@@ -445,7 +754,7 @@ class BuildContext(Utils.Context):
 		except KeyError:
 			error('no such environment: '+name)
 			return None
-	def progress_line(self,state,total,col1,col2):
+	def progress_line(self,state,total,col1,col2,cols=0):
 		n=len(str(total))
 		Utils.rot_idx+=1
 		ind=Utils.rot_chr[Utils.rot_idx%4]
@@ -455,7 +764,7 @@ class BuildContext(Utils.Context):
 		fs="[%%%dd/%%%dd][%%s%%2d%%%%%%s][%s]["%(n,n,ind)
 		left=fs%(state,total,col1,pc,col2)
 		right='][%s%s%s]'%(col1,eta,col2)
-		cols=Utils.get_term_cols()-len(left)-len(right)+2*len(col1)+2*len(col2)
+		cols=(cols or Utils.get_term_cols())-len(left)-len(right)+2*len(col1)+2*len(col2)
 		if cols<7:cols=7
 		ratio=int((cols*state)/total)-1
 		bar=('='*ratio+'>').ljust(cols)
@@ -463,28 +772,20 @@ class BuildContext(Utils.Context):
 		return msg
 	def do_install(self,src,tgt,chmod=O644):
 		if self.is_install>0:
-			if not Options.options.force:
-				try:
-					st1=os.stat(tgt)
-					st2=os.stat(src)
-				except OSError:
-					pass
-				else:
-					if st1.st_mtime>=st2.st_mtime and st1.st_size==st2.st_size:
-						return False
-			srclbl=src.replace(self.srcnode.abspath(None)+os.sep,'')
-			info("* installing %s as %s"%(srclbl,tgt))
-			try:os.remove(tgt)
-			except OSError:pass
-			try:
-				shutil.copy2(src,tgt)
-				os.chmod(tgt,chmod)
-			except IOError:
-				try:
-					os.stat(src)
-				except(OSError,IOError):
-					error('File %r does not exist'%src)
-				raise Utils.WafError('Could not install the file %r'%tgt)
+			self.installed.append(tgt)
+			st=self.install_stat(src,tgt,chmod)
+			if not st:
+				return False
+			if not self.install_queue:
+				self.install_queue=Queue(0)
+				self.install_out=Queue(0)
+				self.install_threads=max(Options.options.jobs,1)
+				for i in xrange(self.install_threads):
+					t=threading.Thread(target=self.install_loop)
+					t.setDaemon(1)
+					t.start()
+			self.install_count+=1
+			self.install_queue.put((src,tgt,chmod,st))
 			return True
 		elif self.is_install<0:
 			info("* uninstalling %s"%tgt)
@@ -492,6 +793,105 @@ class BuildContext(Utils.Context):
 			try:os.remove(tgt)
 			except OSError:pass
 			return True
+	def install_loop(self):
+		queue=self.install_queue
+		while 1:
+			job=queue.get()
+			if job is None:
+				break
+			(src,tgt,chmod,st)=job
+			try:
+				self.install_file(src,tgt,chmod,st)
+			except Utils.WafError,e:
+				self.install_errors.append(str(e))
+			except Exception,e:
+				self.install_errors.append('Could not install the file %r: %s'%(tgt,e))
+			self.install_out.put(tgt)
+	def install_stat(self,src,tgt,chmod):
+		try:
+			st=os.stat(src)
+		except OSError:
+			error('File %r does not exist'%src)
+			raise Utils.WafError('Could not install the file %r'%tgt)
+		if not Options.options.force:
+			try:
+				st1=os.stat(tgt)
+			except OSError:
+				pass
+			else:
+				if st1.st_size==st.st_size and stat.S_IMODE(st1.st_mode)==chmod:
+					if(st1.st_ino==st.st_ino and st1.st_dev==st.st_dev)or Utils.h_file(src)==Utils.h_file(tgt):
+						return None
+		return st
+	def install_file(self,src,tgt,chmod,st):
+		srclbl=src.replace(self.srcnode.abspath(None)+os.sep,'')
+		info("* installing %s as %s"%(srclbl,tgt))
+		link=False
+		if Options.options.destdir and stat.S_IMODE(st.st_mode)==chmod:
+			dir=os.path.dirname(tgt)
+			try:
+				dev=self.install_devs[dir]
+			except KeyError:
+				dev=self.install_devs[dir]=os.stat(dir).st_dev
+			link=dev==st.st_dev
+		try:
+			Utils.clone_file(src,tgt,link)
+			os.chmod(tgt,chmod)
+		except(IOError,OSError):
+			raise Utils.WafError('Could not install the file %r'%tgt)
+		return True
+	def wait_install(self):
+		while self.install_count:
+			self.install_out.get()
+			self.install_count-=1
+		if self.install_queue:
+			for i in xrange(self.install_threads):
+				self.install_queue.put(None)
+			self.install_queue=None
+		if self.install_errors:
+			lst=self.install_errors
+			self.install_errors=[]
+			raise Utils.WafError('\n'.join(lst))
+	def save_install_manifest(self):
+		if not self.installed:return
+		destdir=Options.options.destdir
+		lst=set([])
+		path=os.path.join(self.bdir,INSTALL_FILE)
+		if Options.options.compile_targets:
+			try:
+				lst.update(Utils.readf(path).splitlines())
+			except(IOError,OSError):
+				pass
+		for x in self.installed:
+			if destdir and x.startswith(destdir):
+				x=os.sep+x[len(destdir):].lstrip(os.sep)
+			lst.add(x)
+		lst=list(lst)
+		lst.sort()
+		f=open(path+'.tmp','w')
+		try:
+			f.write('\n'.join(lst)+'\n')
+		finally:
+			f.close()
+		os.rename(path+'.tmp',path)
+		self.installed=[]
+	def uninstall_manifest(self,path):
+		try:
+			lst=Utils.readf(path).splitlines()
+		except(IOError,OSError):
+			return False
+		destdir=Options.options.destdir
+		for x in lst:
+			if not x:continue
+			if destdir:
+				x=os.path.join(destdir,x.lstrip(os.sep))
+			info("* uninstalling %s"%x)
+			self.uninstall.append(x)
+			try:os.remove(x)
+			except OSError:pass
+		os.remove(path)
+		self.remove_install_dirs()
+		return True
 	def get_install_path(self,path,env=None):
 		if not env:env=self.env
 		destdir=env.get_destdir()
@@ -565,6 +965,7 @@ class BuildContext(Utils.Context):
 			if link:
 				info('* symlink %s (-> %s)'%(tgt,src))
 				os.symlink(src,tgt)
+			self.installed.append(tgt)
 			return 0
 		else:
 			try:
@@ -585,7 +986,7 @@ class BuildContext(Utils.Context):
 			self.cwd=kw['cwd']=self.bldnode.abspath()
 		return Utils.exec_command(cmd,**kw)
 	def printout(self,s):
-		f=self.log or sys.stderr
+		f=getattr(threading.currentThread(),'output',None)or self.log or sys.stderr
 		f.write(s)
 		f.flush()
 	def add_subdirs(self,dirs):
@@ -55,6 +55,9 @@ class ConfigurationContext(Utils.Context):
 		self.hash=0
 		self.files=[]
 		self.tool_cache=[]
+		self.check_cache={}
+		self.check_used={}
+		self.prog_sigs={}
 		if self.blddir:
 			self.post_init()
 	def post_init(self):
@@ -75,6 +78,57 @@ class ConfigurationContext(Utils.Context):
 		wafver=WAFVERSION
 		abi=ABI
 		self.log.write(conf_template%vars())
+		self.load_checks()
+	def load_checks(self):
+		self.check_cache={}
+		self.check_used={}
+		if getattr(Options.options,'force_checks',False):
+			return
+		try:
+			f=open(os.path.join(self.blddir,CHECKS_FILE),'rb')
+			try:
+				self.check_cache=cPickle.load(f)
+			finally:
+				f.close()
+		except(IOError,OSError,EOFError,ValueError,cPickle.UnpicklingError):
+			pass
+	def store_checks(self):
+		path=os.path.join(self.blddir,CHECKS_FILE)
+		f=open(path+'.tmp','wb')
+		try:
+			cPickle.dump(self.check_used,f,-1)
+		finally:
+			f.close()
+		os.rename(path+'.tmp',path)
+	def get_check(self,key):
+		try:
+			ret=self.check_cache[key]
+		except KeyError:
+			return None
+		self.check_used[key]=ret
+		if self.log:self.log.write('(cached result %r)\n'%(ret,))
+		return ret
+	def set_check(self,key,value):
+		self.check_used[key]=value
+	def program_sig(self,prog):
+		if isinstance(prog,list):
+			if not prog:return None
+			prog=prog[0]
+		try:
+			return self.prog_sigs[prog]
+		except KeyError:
+			pass
+		path=prog
+		if not os.path.isabs(path):
+			path=find_program_impl(self.env,prog,environ=self.environ)
+		try:
+			st=os.stat(path)
+		except OSError:
+			ret=None
+		else:
+			ret=(path,st.st_mtime,st.st_size,st.st_ino)
+		self.prog_sigs[prog]=ret
+		return ret
 	def __del__(self):
 		if hasattr(self,'log')and self.log:
 			self.log.close()
@@ -112,12 +166,21 @@ class ConfigurationContext(Utils.Context):
 			file=open(os.path.join(self.cachedir,'build.config.py'),'w')
 		file.write('version = 0x%x\n'%HEXVERSION)
 		file.write('tools = %r\n'%self.tools)
+		paths={}
+		for lst in Utils.lazy_index.values():
+			for x in lst:
+				if not x in paths:
+					paths[x]=[os.path.dirname(os.path.abspath(sys.modules[x].__file__))]
+		file.write('lazy = %r\n'%Utils.lazy_index)
+		file.write('lazy_paths = %r\n'%paths)
+		file.write('eager = %r\n'%[t['tool']for t in self.tools if hasattr(sys.modules.get(t['tool'],None),'setup')])
 		file.close()
 		if not self.all_envs:
 			self.fatal('nothing to store in the configuration context!')
 		for key in self.all_envs:
 			tmpenv=self.all_envs[key]
 			tmpenv.store(os.path.join(self.cachedir,key+CACHE_SUFFIX))
+		self.store_checks()
 	def set_env_name(self,name,env):
 		self.all_envs[name]=env
 		return env
@@ -11,6 +11,12 @@ MAXJOBS=99999999
 CACHE_DIR='c4che'
 CACHE_SUFFIX='.cache.py'
 DBFILE='.wafpickle-%d'%ABI
+TIMES_FILE='.waftimes-%d'%ABI
+INSTALL_FILE='.wafinstall-%d'%ABI
+CHECKS_FILE='.wafchecks-%d'%ABI
+TIMES_HISTORY=10
+PROFILE_TOP=15
+PROFILE_TRACE='waf-trace.json'
 WSCRIPT_FILE='wscript'
 WSCRIPT_BUILD_FILE='wscript_build'
 WAF_CONFIG_LOG='config.log'
@@ -29,6 +35,7 @@ CONTINUE="continue"
 JOBCONTROL="JOBCONTROL"
 MAXPARALLEL="MAXPARALLEL"
 NORMAL="NORMAL"
+DAG="DAG"
 NOT_RUN=0
 MISSING=1
 CRASHED=2
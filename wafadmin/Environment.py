@@ -7,70 +7,76 @@ import Logs,Options,Utils
 from Constants import*
 re_imp=re.compile('^(#)*?([^#=]*?)\ =\ (.*?)$',re.M)
 class Environment(object):
-	__slots__=("table","parent")
+	__slots__=("table","own","shared","hashes")
 	def __init__(self,filename=None):
 		self.table={}
+		self.own=set()
+		self.shared=False
+		self.hashes={}
 		if filename:
 			self.load(filename)
+	def __getstate__(self):
+		return self.table
+	def __setstate__(self,data):
+		self.table=dict(data)
+		self.own=set()
+		self.shared=False
+		self.hashes={}
 	def __contains__(self,key):
-		if key in self.table:return True
-		try:return self.parent.__contains__(key)
-		except AttributeError:return False
+		return key in self.table
 	def __str__(self):
-		keys=set()
-		cur=self
-		while cur:
-			keys.update(cur.table.keys())
-			cur=getattr(cur,'parent',None)
-		keys=list(keys)
+		keys=list(self.table.keys())
 		keys.sort()
-		return"\n".join(["%r %r"%(x,self.__getitem__(x))for x in keys])
+		return"\n".join(["%r %r"%(x,self.table[x])for x in keys])
 	def __getitem__(self,key):
-		try:
-			while 1:
-				x=self.table.get(key,None)
-				if not x is None:
-					return x
-				self=self.parent
-		except AttributeError:
+		x=self.table.get(key,None)
+		if x is None:
 			return[]
+		return x
+	def _writable(self):
+		if self.shared:
+			self.table=dict(self.table)
+			self.hashes={}
+			self.shared=False
+		elif self.hashes:
+			self.hashes={}
+		return self.table
 	def __setitem__(self,key,value):
-		self.table[key]=value
+		self._writable()[key]=value
+		self.own.add(key)
 	def __delitem__(self,key,value):
-		del self.table[key]
+		del self._writable()[key]
 	def set_variant(self,name):
-		self.table[VARIANT]=name
+		self[VARIANT]=name
 	def variant(self):
-		try:
-			while 1:
-				x=self.table.get(VARIANT,None)
-				if not x is None:
-					return x
-				self=self.parent
-		except AttributeError:
+		x=self.table.get(VARIANT,None)
+		if x is None:
 			return DEFAULT
+		return x
 	def copy(self):
 		newenv=Environment()
-		newenv.parent=self
+		newenv.table=self.table
+		newenv.hashes=self.hashes
+		newenv.shared=self.shared=True
+		self.own=set()
 		return newenv
 	def get_flat(self,key):
 		s=self[key]
 		if isinstance(s,str):return s
 		return' '.join(s)
 	def _get_list_value_for_modification(self,key):
-		try:
-			value=self.table[key]
-		except KeyError:
-			try:value=self.parent[key]
-			except AttributeError:value=[]
-			if isinstance(value,list):
-				value=copy.copy(value)
-			else:
-				value=[value]
+		value=self.table.get(key,None)
+		if value is None:
+			value=[]
+		elif not isinstance(value,list):
+			value=[value]
+		elif not key in self.own:
+			value=copy.copy(value)
 		else:
-			if not isinstance(value,list):
-				value=[value]
-		self.table[key]=value
+			if self.hashes:
+				self.hashes={}
+			return value
+		self[key]=value
 		return value
 	def append_value(self,var,value):
 		current_value=self._get_list_value_for_modification(var)
@@ -81,8 +87,7 @@ class Environment(object):
 	def prepend_value(self,var,value):
 		current_value=self._get_list_value_for_modification(var)
 		if isinstance(value,list):
-			current_value=value+current_value
-			self.table[var]=current_value
+			self[var]=value+current_value
 		else:
 			current_value.insert(0,value)
 	def append_unique(self,var,value):
@@ -94,17 +99,54 @@ class Environment(object):
 		else:
 			if value not in current_value:
 				current_value.append(value)
+	def hash_vars(self,vars_lst):
+		key=tuple(vars_lst)
+		hashes=self.hashes
+		try:
+			return hashes[key]
+		except KeyError:
+			pass
+		m=Utils.md5()
+		for a in key:
+			try:
+				h=hashes[a]
+			except KeyError:
+				h=hashes[a]=Utils.h_list(self[a])
+			m.update(h)
+		ret=hashes[key]=m.digest()
+		return ret
+	def get_args(self,frag):
+		key=('argv',frag)
+		hashes=self.hashes
+		try:
+			return hashes[key]
+		except KeyError:
+			pass
+		lst=[]
+		for(var,val)in frag:
+			if var is None:
+				lst.extend(val)
+			else:
+				val=self[var]
+				if isinstance(val,str):lst.append(val)
+				else:lst.extend(val)
+		ret=hashes[key]=[x for x in lst if x]
+		return ret
+	def get_line(self,frag):
+		key=('line',frag)
+		hashes=self.hashes
+		try:
+			return hashes[key]
+		except KeyError:
+			pass
+		buf=[]
+		for(var,val)in frag:
+			if var is None:buf.append(val)
+			else:buf.append(self.get_flat(var).replace('%','%%'))
+		ret=hashes[key]=''.join(buf)
+		return ret
 	def get_merged_dict(self):
-		table_list=[]
-		env=self
-		while 1:
-			table_list.insert(0,env.table)
-			try:env=env.parent
-			except AttributeError:break
-		merged_table={}
-		for table in table_list:
-			merged_table.update(table)
-		return merged_table
+		return dict(self.table)
 	def store(self,filename):
 		file=open(filename,'w')
 		merged_table=self.get_merged_dict()
@@ -113,7 +155,7 @@ class Environment(object):
 		for k in keys:file.write('%s = %r\n'%(k,merged_table[k]))
 		file.close()
 	def load(self,filename):
-		tbl=self.table
+		tbl=self._writable()
 		code=Utils.readf(filename)
 		for m in re_imp.finditer(code):
 			g=m.group
@@ -128,6 +170,8 @@ class Environment(object):
 	def __getattr__(self,name):
 		if name in self.__slots__:
 			return object.__getattr__(self,name)
+		elif name.startswith('__'):
+			raise AttributeError(name)
 		else:
 			return self[name]
 	def __setattr__(self,name,value):
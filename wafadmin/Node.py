@@ -3,6 +3,8 @@
 
 import os,sys,fnmatch,re
 import Utils
+try:intern
+except NameError:from sys import intern
 UNDEFINED=0
 DIR=1
 FILE=2
@@ -39,7 +41,7 @@ exclude_regs='''
 class Node(object):
 	__slots__=("name","parent","id","childs")
 	def __init__(self,name,parent,node_type=UNDEFINED):
-		self.name=name
+		self.name=name=intern(name)
 		self.parent=parent
 		self.__class__.bld.id_nodes+=4
 		self.id=self.__class__.bld.id_nodes+node_type
@@ -49,9 +51,10 @@ class Node(object):
 		if parent:parent.childs[name]=self
 	def __setstate__(self,data):
 		if len(data)==4:
-			(self.parent,self.name,self.id,self.childs)=data
+			(self.parent,name,self.id,self.childs)=data
 		else:
-			(self.parent,self.name,self.id)=data
+			(self.parent,name,self.id)=data
+		self.name=intern(name)
 	def __getstate__(self):
 		if getattr(self,'childs',None)is None:
 			return(self.parent,self.name,self.id)
@@ -392,76 +395,105 @@ class Node(object):
 		dir=kw.get('dir',0)
 		excl=kw.get('excl',exclude_regs)
 		incl=k and k[0]or kw.get('incl','**')
-		def to_pat(s):
-			lst=Utils.to_list(s)
-			ret=[]
-			for x in lst:
-				x=x.replace('//','/')
-				if x.endswith('/'):
-					x+='**'
-				lst2=x.split('/')
-				accu=[]
-				for k in lst2:
-					if k=='**':
-						accu.append(k)
-					else:
-						k=k.replace('.','[.]').replace('*','.*').replace('?','.')
-						k='^%s$'%k
-						accu.append(re.compile(k))
-				ret.append(accu)
-			return ret
-		def filtre(name,nn):
-			ret=[]
-			for lst in nn:
-				if not lst:
-					pass
-				elif lst[0]=='**':
-					ret.append(lst)
-					if len(lst)>1:
-						if lst[1].match(name):
-							ret.append(lst[2:])
-					else:
-						ret.append([])
-				elif lst[0].match(name):
-					ret.append(lst[1:])
-			return ret
-		def accept(name,pats):
-			nacc=filtre(name,pats[0])
-			nrej=filtre(name,pats[1])
-			if[]in nrej:
-				nacc=[]
-			return[nacc,nrej]
-		def ant_iter(nodi,maxdepth=25,pats=[]):
-			nodi.__class__.bld.rescan(nodi)
-			for name in nodi.__class__.bld.cache_dir_contents[nodi.id]:
-				npats=accept(name,pats)
-				if npats and npats[0]:
-					accepted=[]in npats[0]
+		key=(tuple(Utils.to_list(incl)),tuple(Utils.to_list(excl)))
+		try:
+			m=ant_cache[key]
+		except KeyError:
+			m=ant_cache[key]=ant_matcher(incl,excl)
+		tree=self.__class__.bld
+		bldid=tree.bldnode.id
+		ret=[]
+		def ant_walk(nodi,state,maxdepth):
+			tree.rescan(nodi)
+			for name in tree.cache_dir_contents[nodi.id]:
+				val=m.step(state,name)
+				if not val:continue
+				(nstate,accepted,live)=val
+				if accepted:
 					node=nodi.find_resource(name)
-					if node and accepted:
+					if node:
 						if src and node.id&3==FILE:
-							yield node
-					else:
-						node=nodi.find_dir(name)
-						if node and node.id!=nodi.__class__.bld.bldnode.id:
-							if accepted and dir:
-								yield node
-							if maxdepth:
-								for k in ant_iter(node,maxdepth=maxdepth-1,pats=npats):
-									yield k
+							ret.append(node)
+						continue
+				if not live and not(accepted and dir):
+					continue
+				node=nodi.find_dir(name)
+				if node and node.id!=bldid:
+					if accepted and dir:
+						ret.append(node)
+					if maxdepth and live:
+						ant_walk(node,nstate,maxdepth-1)
 			if bld:
 				for node in nodi.childs.values():
-					if node.id==nodi.__class__.bld.bldnode.id:
-						continue
-					if node.id&3==BUILD:
-						npats=accept(node.name,pats)
-						if npats and npats[0]and[]in npats[0]:
-							yield node
-			raise StopIteration
-		ret=[x for x in ant_iter(self,pats=[to_pat(incl),to_pat(excl)])]
+					if node.id&3==BUILD and node.id!=bldid:
+						val=m.step(state,node.name)
+						if val and val[1]:
+							ret.append(node)
+		ant_walk(self,m.start,25)
 		if kw.get('flat',True):
 			return" ".join([x.relpath_gen(self)for x in ret])
 		return ret
+ant_cache={}
+class ant_matcher(object):
+	def __init__(self,incl,excl):
+		self.incl=self.compile(incl)
+		self.excl=self.compile(excl)
+		self.start=(tuple([(i,0)for i in range(len(self.incl))]),tuple([(i,0)for i in range(len(self.excl))]))
+		self.cache={}
+	def compile(self,s):
+		ret=[]
+		for x in Utils.to_list(s):
+			x=x.replace('//','/')
+			if x.endswith('/'):
+				x+='**'
+			accu=[]
+			for k in x.split('/'):
+				if k=='**':
+					if accu and accu[-1]=='**':continue
+					accu.append(k)
+				else:
+					k=k.replace('.','[.]').replace('*','.*').replace('?','.')
+					accu.append(re.compile('^%s$'%k))
+			ret.append(accu)
+		return ret
+	def advance(self,pats,state,name):
+		ret=set([])
+		done=False
+		for(i,k)in state:
+			p=pats[i]
+			seg=p[k]
+			if seg=='**':
+				ret.add((i,k))
+				if k+1==len(p):
+					done=True
+				elif p[k+1].match(name):
+					ret.add((i,k+2))
+			elif seg.match(name):
+				ret.add((i,k+1))
+		live=[]
+		for(i,k)in ret:
+			if k==len(pats[i]):
+				done=True
+			else:
+				live.append((i,k))
+		live.sort()
+		return(tuple(live),done)
+	def step(self,state,name):
+		key=(state,name)
+		try:
+			return self.cache[key]
+		except KeyError:
+			pass
+		ret=None
+		(exc,excluded)=self.advance(self.excl,state[1],name)
+		if not excluded:
+			(inc,accepted)=self.advance(self.incl,state[0],name)
+			if inc or accepted:
+				ret=((inc,exc),accepted,len(inc)>0)
+		if len(self.cache)>100000:
+			self.cache.clear()
+		self.cache[key]=ret
+		return ret
 class Nodu(Node):
-	pass
+	__slots__=()
 
@@ -14,6 +14,8 @@ tooldir=''
 lockfile=os.environ.get('WAFLOCK','.lock-wscript')
 try:cache_global=os.path.abspath(os.environ['WAFCACHE'])
 except KeyError:cache_global=''
+try:cache_max=int(os.environ['WAFCACHE_SIZE'])*1024*1024
+except(KeyError,ValueError):cache_max=10*1024*1024*1024
 platform=Utils.detect_platform()
 conf_file='conf-runs-%s-%d.pickle'%(platform,ABI)
 default_prefix=os.environ.get('PREFIX')
@@ -68,12 +70,18 @@ def create_parser(module=None):
 	p('--nocache',action='store_true',default=False,help='ignore the WAFCACHE (if set)',dest='nocache')
 	p('--zones',action='store',default='',help='debugging zones (task_gen, deps, tasks, etc)',dest='zones')
 	p('-p','--progress',action='count',default=0,help='-p: progress bar; -pp: ide output',dest='progress_bar')
+	p('--hash-mode',type='choice',choices=['content','stat'],default='stat',help='reuse source file hashes while mtime/size/inode are unchanged (stat) or always read the files (content) [default: stat]',dest='hash_mode')
+	p('--priority',type='choice',choices=['fifo','critical'],default='critical',help='run the tasks on the longest estimated path first (critical) or in declaration order (fifo) [default: critical]',dest='priority')
+	p('--profile-build',action='store_true',default=False,help='report the slowest tasks and the worker usage, and write a trace of the build',dest='profile_build')
+	p('--log-json',action='store',default='',help='write the task events as json lines to the given file (- for stdout)',dest='log_json')
+	p('--fork-server',action='store_true',default=False,help='launch the commands from small helper processes instead of forking waf',dest='fork_server')
 	p('--targets',action='store',default='',help='build given task generators, e.g. "target1,target2"',dest='compile_targets')
 	gr=optparse.OptionGroup(parser,'configuration options')
 	parser.add_option_group(gr)
 	gr.add_option('-b','--blddir',action='store',default='',help='build dir for the project (configuration)',dest='blddir')
 	gr.add_option('-s','--srcdir',action='store',default='',help='src dir for the project (configuration)',dest='srcdir')
 	gr.add_option('--prefix',help='installation prefix (configuration) [default: %r]'%default_prefix,default=default_prefix,dest='prefix')
+	gr.add_option('--force-checks',action='store_true',default=False,help='run the configuration checks again instead of reusing the cached results',dest='force_checks')
 	gr=optparse.OptionGroup(parser,'installation options')
 	parser.add_option_group(gr)
 	gr.add_option('--destdir',help='installation root [default: %r]'%default_destdir,default=default_destdir,dest='destdir')
@@ -104,6 +112,7 @@ def parse_args_impl(parser,_args=None):
 	if options.jobs<1:options.jobs=1
 	if'install'in sys.argv or'uninstall'in sys.argv:
 		options.destdir=options.destdir and os.path.abspath(os.path.expanduser(options.destdir))
+	Utils.fork_server=options.fork_server and not Utils.is_win32
 	Logs.verbose=options.verbose
 	Logs.init_log()
 	if options.zones:
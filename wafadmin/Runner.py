@@ -2,13 +2,19 @@
 # encoding: utf-8
 import sys
 if sys.hexversion < 0x020400f0: from sets import Set as set
-import sys,random,time,threading,traceback
-try:from Queue import Queue
-except ImportError:from queue import Queue
+import os,sys,random,time,threading,traceback,tempfile
+from heapq import heappush,heappop
+try:from Queue import Queue,Empty
+except ImportError:from queue import Queue,Empty
 import Build,Utils,Logs,Options
 from Logs import debug,error
 from Constants import*
 GAP=15
+INTERVAL=0.1
+STATUS={MISSING:'missing',CRASHED:'crashed',EXCEPTION:'exception',SKIPPED:'skipped',SUCCESS:'success'}
+json_log=None
+start_hooks=[]
+stop_hooks=[]
 run_old=threading.Thread.run
 def run(*args,**kwargs):
 	try:
@@ -19,10 +25,13 @@ def run(*args,**kwargs):
 		sys.excepthook(*sys.exc_info())
 threading.Thread.run=run
 class TaskConsumer(threading.Thread):
-	def __init__(self,m):
+	def __init__(self,m,slot=0):
 		threading.Thread.__init__(self)
 		self.setDaemon(1)
 		self.master=m
+		self.slot=slot
+		self.cpu_time=0.0
+		self.output=tempfile.TemporaryFile()
 		self.start()
 	def run(self):
 		try:
@@ -36,34 +45,142 @@ class TaskConsumer(threading.Thread):
 			if m.stop:
 				m.out.put(tsk)
 				continue
+			m.printer.started(tsk)
+			self.process(tsk)
+			m.printer.finished(tsk,self.read_output())
+			m.out.put(tsk)
+	def process(self,tsk):
+		m=self.master
+		try:
+			self.cpu_time=0.0
+			t=time.time()
+			if tsk.__class__.stat:ret=tsk.__class__.stat(tsk)
+			else:ret=tsk.call_run()
+			tsk.timing=(t,time.time(),self.cpu_time,t-getattr(tsk,'queued',t),self.slot)
+			if not ret and hasattr(tsk,'unique_id'):
+				tsk.generator.bld.task_durations[tsk.unique_id()]=tsk.timing[1]-t
+		except Exception,e:
+			tsk.err_msg=Utils.ex_stack()
+			tsk.hasrun=EXCEPTION
+			m.error_handler(tsk)
+			return
+		if ret:
+			tsk.err_code=ret
+			tsk.hasrun=CRASHED
+		else:
 			try:
-				tsk.generator.bld.printout(tsk.display())
-				if tsk.__class__.stat:ret=tsk.__class__.stat(tsk)
-				else:ret=tsk.call_run()
-			except Exception,e:
+				tsk.post_run()
+			except Utils.WafError:
+				pass
+			except Exception:
 				tsk.err_msg=Utils.ex_stack()
 				tsk.hasrun=EXCEPTION
-				m.error_handler(tsk)
-				m.out.put(tsk)
-				continue
-			if ret:
-				tsk.err_code=ret
-				tsk.hasrun=CRASHED
 			else:
-				try:
-					tsk.post_run()
-				except Utils.WafError:
-					pass
-				except Exception:
-					tsk.err_msg=Utils.ex_stack()
-					tsk.hasrun=EXCEPTION
-				else:
-					tsk.hasrun=SUCCESS
-			if tsk.hasrun!=SUCCESS:
-				m.error_handler(tsk)
-			m.out.put(tsk)
+				tsk.hasrun=SUCCESS
+		if tsk.hasrun!=SUCCESS:
+			m.error_handler(tsk)
+	def read_output(self):
+		f=self.output
+		f.flush()
+		if not os.fstat(f.fileno()).st_size:
+			return''
+		f.seek(0)
+		s=f.read()
+		f.seek(0)
+		f.truncate()
+		return s
+class Printer(threading.Thread):
+	def __init__(self,bld):
+		global json_log
+		threading.Thread.__init__(self)
+		self.setDaemon(1)
+		self.bld=bld
+		self.mode=Options.options.progress_bar
+		path=getattr(Options.options,'log_json','')
+		if path and not json_log:
+			if path=='-':json_log=sys.stdout
+			else:json_log=open(path,'w')
+		self.queue=Queue(0)
+		self.begin={}
+		self.last=None
+		self.state=None
+		self.drawn=0
+		self.cols=0
+		self.cols_time=0
+		self.start()
+	def started(self,tsk):
+		self.queue.put((0,tsk,time.time()))
+	def finished(self,tsk,out):
+		self.queue.put((1,tsk,out))
+	def stop(self,error):
+		self.queue.put(None)
+		self.join()
+		if json_log:
+			json_log.write('{"event": "build", "status": "%s", "time": %.6f}\n'%(error and'failed'or'success',time.time()))
+			json_log.flush()
+	def run(self):
+		bar=self.mode==1
+		while 1:
+			if bar:
+				try:msg=self.queue.get(True,INTERVAL)
+				except Empty:msg=False
+			else:
+				msg=self.queue.get()
+			if msg is None:
+				break
+			if msg:
+				self.handle(*msg)
+			if bar:
+				self.draw()
+		if bar:
+			self.draw(True)
+	def handle(self,kind,tsk,data):
+		if json_log:
+			self.log_event(kind,tsk,data)
+		if not kind:
+			if self.mode==1:
+				self.state=tsk
+			else:
+				self.write(tsk.display())
+				self.last=tsk
+		elif data:
+			if self.mode==1:
+				self.write('\x1b[K'+data)
+				self.draw(True)
+			else:
+				if not self.last is tsk:
+					data=tsk.display()+data
+				self.write(data)
+				self.last=tsk
+	def draw(self,force=False):
+		tsk=self.state
+		now=time.time()
+		if not tsk or(not force and now-self.drawn<INTERVAL):
+			return
+		if now-self.cols_time>1:
+			self.cols=Utils.get_term_cols()
+			self.cols_time=now
+		self.write(self.bld.progress_line(tsk.position[0],tsk.position[1],Logs.colors(tsk.color),Logs.colors.NORMAL,self.cols))
+		self.drawn=now
+	def write(self,s):
+		f=self.bld.log or sys.stderr
+		f.write(s)
+		f.flush()
+	def log_event(self,kind,tsk,data):
+		quote=Build.json_quote
+		name=quote(str(tsk).strip())
+		cls=quote(tsk.__class__.__name__)
+		if not kind:
+			self.begin[id(tsk)]=data
+			json_log.write('{"event": "start", "task": %s, "class": %s, "position": %d, "total": %d, "time": %.6f}\n'%(name,cls,tsk.position[0],tsk.position[1],data))
+		else:
+			now=time.time()
+			t=self.begin.pop(id(tsk),now)
+			json_log.write('{"event": "end", "task": %s, "class": %s, "status": "%s", "code": %d, "time": %.6f, "duration": %.6f, "output": %s}\n'%(name,cls,STATUS.get(tsk.hasrun,'unknown'),getattr(tsk,'err_code',0)or 0,now,now-t,quote(data)))
+			json_log.flush()
 class Parallel(object):
 	def __init__(self,bld,j=2):
+		self.bld=bld
 		self.numjobs=j
 		self.manager=bld.task_manager
 		self.manager.current_group=0
@@ -76,12 +193,26 @@ class Parallel(object):
 		self.count=0
 		self.processed=1
 		self.consumers=None
+		self.printer=None
 		self.stop=False
 		self.error=False
+		self.priority=getattr(Options.options,'priority','critical')=='critical'
+		self.seq=0
+	def add_outstanding(self,lst):
+		for tsk in lst:
+			self.seq+=1
+			if self.priority:
+				heappush(self.outstanding,(-tsk.path_cost,self.seq,tsk))
+			else:
+				heappush(self.outstanding,(0,self.seq,tsk))
+		if self.numjobs>1 and len(lst)>1:
+			for tsk in lst:
+				if getattr(tsk,'prefetch',None):
+					tsk.prefetch()
 	def get_next(self):
 		if not self.outstanding:
 			return None
-		return self.outstanding.pop(0)
+		return heappop(self.outstanding)[2]
 	def postpone(self,tsk):
 		if random.randint(0,1):
 			self.frozen.insert(0,tsk)
@@ -94,25 +225,49 @@ class Parallel(object):
 			if self.count:
 				self.get_out()
 			if self.frozen:
-				self.outstanding+=self.frozen
+				self.add_outstanding(self.frozen)
 				self.frozen=[]
-			elif not self.count:
+			elif not self.count and not self.outstanding:
 				(jobs,tmp)=self.manager.get_next_set()
 				if jobs!=None:self.maxjobs=jobs
-				if tmp:self.outstanding+=tmp
+				if tmp:self.add_outstanding(tmp)
 				break
+	def add_finished(self,tsk):
+		self.add_outstanding(self.manager.add_finished(tsk))
 	def get_out(self):
 		ret=self.out.get()
-		self.manager.add_finished(ret)
+		if ret.hasrun==SUCCESS and getattr(ret,'serial_post_run',None):
+			self.serial_post_run(ret)
+		self.add_finished(ret)
 		if not self.stop and getattr(ret,'more_tasks',None):
-			self.outstanding+=ret.more_tasks
+			self.add_outstanding(ret.more_tasks)
 			self.total+=len(ret.more_tasks)
 		self.count-=1
+	def serial_post_run(self,tsk):
+		try:
+			tsk.serial_post_run()
+		except Utils.WafError:
+			tsk.hasrun=MISSING
+		except Exception:
+			tsk.err_msg=Utils.ex_stack()
+			tsk.hasrun=EXCEPTION
+		if tsk.hasrun!=SUCCESS:
+			self.error_handler(tsk)
 	def error_handler(self,tsk):
 		if not Options.options.keep:
 			self.stop=True
 		self.error=True
 	def start(self):
+		for fun in start_hooks:
+			fun(self)
+		try:
+			self.schedule()
+		finally:
+			if self.printer:
+				self.printer.stop(self.error)
+			for fun in stop_hooks:
+				fun(self)
+	def schedule(self):
 		while not self.stop:
 			self.refill_task_list()
 			tsk=self.get_next()
@@ -123,7 +278,7 @@ class Parallel(object):
 					break
 			if tsk.hasrun:
 				self.processed+=1
-				self.manager.add_finished(tsk)
+				self.add_finished(tsk)
 				continue
 			try:
 				st=tsk.runnable_status()
@@ -132,21 +287,23 @@ class Parallel(object):
 				tsk.hasrun=EXCEPTION
 				self.processed+=1
 				self.error_handler(tsk)
-				self.manager.add_finished(tsk)
+				self.add_finished(tsk)
 				continue
 			if st==ASK_LATER:
 				self.postpone(tsk)
 			elif st==SKIP_ME:
 				self.processed+=1
 				tsk.hasrun=SKIPPED
-				self.manager.add_finished(tsk)
+				self.add_finished(tsk)
 			else:
 				tsk.position=(self.processed,self.total)
 				self.count+=1
+				tsk.queued=time.time()
 				self.ready.put(tsk)
 				self.processed+=1
 				if not self.consumers:
-					self.consumers=[TaskConsumer(self)for i in xrange(self.numjobs)]
+					self.printer=Printer(self.bld)
+					self.consumers=[TaskConsumer(self,i)for i in xrange(self.numjobs)]
 		while self.error and self.count:
 			self.get_out()
 		assert(self.count==0 or self.stop)
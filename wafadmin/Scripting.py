@@ -1,7 +1,7 @@
 #! /usr/bin/env python
 # encoding: utf-8
 
-import os,sys,shutil,traceback,datetime,inspect
+import os,sys,shutil,traceback,datetime
 import Utils,Configure,Build,Logs,Options,Environment,Task
 from Logs import error,warn,info
 from Constants import*
@@ -256,6 +256,13 @@ def uninstall(bld):
 	Options.commands['uninstall']=True
 	Options.is_install=True
 	bld.is_install=UNINSTALL
+	try:
+		proj=Environment.Environment(Options.lockfile)
+	except IOError:
+		pass
+	else:
+		if bld.uninstall_manifest(os.path.join(proj[BLDDIR],INSTALL_FILE)):
+			return
 	try:
 		def runnable_status(self):
 			return SKIP_ME
@@ -287,6 +294,7 @@ def build_impl(bld):
 	finally:
 		if Options.options.progress_bar:print('')
 		info("Waf: Leaving directory `%s'"%bld.bldnode.abspath())
+	bld.wait_install()
 	bld.post_build()
 	bld.install()
 excludes='.bzr .bzrignore .git .gitignore .svn CVS .cvsignore .arch-ids {arch} SCCS BitKeeper .hg _MTN _darcs Makefile Makefile.in config.log'.split()
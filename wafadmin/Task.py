@@ -7,28 +7,69 @@ from Utils import md5
 import Build,Runner,Utils,Node,Logs,Options
 from Logs import debug,warn,error
 from Constants import*
-algotype=NORMAL
+algotype=DAG
 COMPILE_TEMPLATE_SHELL='''
+from time import time
+line = %r
 def f(task):
+	t = time()
 	env = task.env
 	wd = getattr(task, 'cwd', None)
-	p = env.get_flat
-	cmd = \'\'\' %s \'\'\' % s
+	cmd = env.get_line(line) %% (%s)
+	task.cmd_time = time() - t
 	return task.exec_command(cmd, cwd=wd)
 '''
 COMPILE_TEMPLATE_NOSHELL='''
+from time import time
+frags = %r
 def f(task):
+	t = time()
 	env = task.env
 	wd = getattr(task, 'cwd', None)
-	def to_list(xx):
-		if isinstance(xx, str): return [xx]
-		return xx
 	lst = []
 	%s
 	lst = [x for x in lst if x]
+	task.cmd_time = time() - t
 	return task.exec_command(lst, cwd=wd)
 '''
 file_deps=Utils.nada
+def cache_path(ssig,cnt,name):
+	return os.path.join(Options.cache_global,ssig[:2],'%s_%d_%s'%(ssig,cnt,name))
+CACHE_SIZE_FILE='.wafcache_size'
+def trim_cache(stored=0):
+	size_file=os.path.join(Options.cache_global,CACHE_SIZE_FILE)
+	try:total=int(Utils.readf(size_file))+stored
+	except(IOError,OSError,ValueError):total=None
+	if total is None or total>Options.cache_max:
+		lst=[]
+		total=0
+		for(dirpath,dirnames,filenames)in os.walk(Options.cache_global):
+			for x in filenames:
+				path=os.path.join(dirpath,x)
+				if path==size_file:continue
+				try:st=os.stat(path)
+				except OSError:continue
+				lst.append((st.st_mtime,st.st_size,path))
+				total+=st.st_size
+		if total>Options.cache_max:
+			lst.sort()
+			limit=Options.cache_max*9/10
+			cnt=0
+			for(mtime,size,path)in lst:
+				if total<=limit:break
+				try:os.remove(path)
+				except OSError:continue
+				total-=size
+				cnt+=1
+			debug('task: removed %d files from the cache %r'%(cnt,Options.cache_global))
+	tmp='%s.%d.tmp'%(size_file,os.getpid())
+	try:
+		f=open(tmp,'w')
+		try:f.write(str(total))
+		finally:f.close()
+		os.rename(tmp,size_file)
+	except(IOError,OSError):
+		pass
 class TaskManager(object):
 	def __init__(self):
 		self.groups=[]
@@ -80,6 +121,9 @@ class TaskManager(object):
 				if f:f(tsk)
 			else:
 				tsk.install()
+		if self.current_group<len(self.groups):
+			return self.groups[self.current_group].task_done(tsk)
+		return[]
 class TaskGroup(object):
 	def __init__(self):
 		self.tasks=[]
@@ -88,6 +132,7 @@ class TaskGroup(object):
 		self.cstr_order=Utils.DefaultDict(set)
 		self.temp_tasks=[]
 		self.ready=0
+		self.key_of={}
 	def reset(self):
 		for x in self.cstr_groups:
 			self.tasks+=self.cstr_groups[x]
@@ -96,6 +141,7 @@ class TaskGroup(object):
 		self.cstr_groups=Utils.DefaultDict(list)
 		self.cstr_order=Utils.DefaultDict(set)
 		self.ready=0
+		self.key_of={}
 	def prepare(self):
 		self.ready=1
 		file_deps(self.tasks)
@@ -111,6 +157,9 @@ class TaskGroup(object):
 		elif algotype==MAXPARALLEL:
 			tasks=self.tasks_with_inner_constraints()
 			maxj=MAXJOBS
+		elif algotype==DAG:
+			tasks=self.tasks_from_graph()
+			maxj=MAXJOBS
 		else:
 			raise Utils.WafError("unknown algorithm type %s"%(algotype))
 		if not tasks:return()
@@ -122,52 +171,37 @@ class TaskGroup(object):
 			self.cstr_groups[h].append(x)
 	def set_order(self,a,b):
 		self.cstr_order[a].add(b)
-	def compare_exts(self,t1,t2):
-		x="ext_in"
-		y="ext_out"
-		in_=t1.attr(x,())
-		out_=t2.attr(y,())
-		for k in in_:
-			if k in out_:
-				return-1
-		in_=t2.attr(x,())
-		out_=t1.attr(y,())
-		for k in in_:
-			if k in out_:
-				return 1
-		return 0
-	def compare_partial(self,t1,t2):
-		m="after"
-		n="before"
-		name=t2.__class__.__name__
-		if name in Utils.to_list(t1.attr(m,())):return-1
-		elif name in Utils.to_list(t1.attr(n,())):return 1
-		name=t1.__class__.__name__
-		if name in Utils.to_list(t2.attr(m,())):return 1
-		elif name in Utils.to_list(t2.attr(n,())):return-1
-		return 0
 	def extract_constraints(self):
-		keys=self.cstr_groups.keys()
-		max=len(keys)
-		for i in xrange(max):
-			t1=self.cstr_groups[keys[i]][0]
-			for j in xrange(i+1,max):
-				t2=self.cstr_groups[keys[j]][0]
-				val=(self.compare_exts(t1,t2)or self.compare_partial(t1,t2))
-				if val>0:
-					self.set_order(keys[i],keys[j])
-				elif val<0:
-					self.set_order(keys[j],keys[i])
+		keys=list(self.cstr_groups.keys())
+		outs=Utils.DefaultDict(list)
+		names=Utils.DefaultDict(list)
+		for k in keys:
+			t=self.cstr_groups[k][0]
+			for x in Utils.to_list(t.attr('ext_out',())):
+				outs[x].append(k)
+			names[t.__class__.__name__].append(k)
+		for k in keys:
+			t=self.cstr_groups[k][0]
+			for x in Utils.to_list(t.attr('ext_in',())):
+				for a in outs.get(x,()):
+					if a!=k:self.set_order(a,k)
+			for x in Utils.to_list(t.attr('after',())):
+				for a in names.get(x,()):
+					if a!=k:self.set_order(a,k)
+			for x in Utils.to_list(t.attr('before',())):
+				for b in names.get(x,()):
+					if b!=k:self.set_order(k,b)
 	def tasks_in_parallel(self):
 		if not self.ready:self.prepare()
 		keys=self.cstr_groups.keys()
+		blocked=set()
+		for k in self.cstr_order.values():
+			blocked.update(k)
 		unconnected=[]
 		remainder=[]
 		for u in keys:
-			for k in self.cstr_order.values():
-				if u in k:
-					remainder.append(u)
-					break
+			if u in blocked:
+				remainder.append(u)
 			else:
 				unconnected.append(u)
 		toreturn=[]
@@ -180,6 +214,113 @@ class TaskGroup(object):
 		if not toreturn and remainder:
 			raise Utils.WafError("circular order constraint detected %r"%remainder)
 		return toreturn
+	def make_graph(self):
+		ids=set([id(t)for t in self.tasks])
+		npred=Utils.DefaultDict(int)
+		for a in self.cstr_order:
+			for b in self.cstr_order[a]:
+				npred[b]+=1
+		self.waiting={}
+		self.succ=Utils.DefaultDict(list)
+		self.left={}
+		self.key_of={}
+		roots=[]
+		for k in self.cstr_groups:
+			lst=self.cstr_groups[k]
+			self.left[k]=len(lst)
+			for t in lst:
+				self.key_of[id(t)]=k
+				n=npred[k]
+				for x in getattr(t,'run_after',[]):
+					if id(x)in ids and not x.hasrun:
+						self.succ[id(x)].append(t)
+						n+=1
+				self.waiting[id(t)]=n
+				if not n:roots.append(t)
+		self.pending=len(self.key_of)
+		depth={}
+		gdepth=Utils.DefaultDict(int)
+		waiting=self.waiting.copy()
+		left=self.left.copy()
+		stack=roots[:]
+		order=[]
+		while stack:
+			t=stack.pop()
+			order.append(t)
+			k=self.key_of[id(t)]
+			d=depth.get(id(t),0)+1
+			depth[id(t)]=d
+			if d>gdepth[k]:gdepth[k]=d
+			for x in self.succ.get(id(t),()):
+				if d>depth.get(id(x),0):depth[id(x)]=d
+				waiting[id(x)]-=1
+				if not waiting[id(x)]:stack.append(x)
+			left[k]-=1
+			if not left[k]:
+				for b in self.cstr_order.get(k,()):
+					for x in self.cstr_groups[b]:
+						if gdepth[k]>depth.get(id(x),0):depth[id(x)]=gdepth[k]
+						waiting[id(x)]-=1
+						if not waiting[id(x)]:stack.append(x)
+		if len(order)!=self.pending:
+			raise Utils.WafError("circular order constraint detected %r"%[t for t in self.tasks if waiting.get(id(t),0)])
+		self.critical_path=max([0]+list(gdepth.values()))
+		cost=self.estimate_costs(order)
+		debug('runner: %d tasks, critical path of %d tasks (%.3fs estimated)'%(self.pending,self.critical_path,cost))
+		return roots
+	def estimate_costs(self,order):
+		times={}
+		known=Utils.DefaultDict(list)
+		for t in order:
+			try:
+				d=t.generator.bld.task_durations[t.unique_id()]
+			except(AttributeError,KeyError):
+				continue
+			times[id(t)]=d
+			known[t.__class__.__name__].append(d)
+		avg={}
+		for x in known:
+			avg[x]=sum(known[x])/len(known[x])
+		default=1.0
+		if avg:default=sum(avg.values())/len(avg)
+		grem=Utils.DefaultDict(float)
+		ret=0.0
+		for t in reversed(order):
+			k=self.key_of[id(t)]
+			c=0.0
+			for x in self.succ.get(id(t),()):
+				if x.path_cost>c:c=x.path_cost
+			for b in self.cstr_order.get(k,()):
+				if grem[b]>c:c=grem[b]
+			c+=times.get(id(t),avg.get(t.__class__.__name__,default))
+			t.path_cost=c
+			if c>grem[k]:grem[k]=c
+			if c>ret:ret=c
+		return ret
+	def tasks_from_graph(self):
+		if not self.ready:
+			self.prepare()
+			return self.make_graph()
+		if self.pending:
+			raise Utils.WafError("circular order constraint detected %r"%[t for t in self.tasks if id(t)in self.key_of])
+		return[]
+	def task_done(self,tsk):
+		try:
+			k=self.key_of.pop(id(tsk))
+		except KeyError:
+			return[]
+		self.pending-=1
+		ret=[]
+		for x in self.succ.get(id(tsk),()):
+			self.waiting[id(x)]-=1
+			if not self.waiting[id(x)]:ret.append(x)
+		self.left[k]-=1
+		if not self.left[k]:
+			for b in self.cstr_order.get(k,()):
+				for x in self.cstr_groups[b]:
+					self.waiting[id(x)]-=1
+					if not self.waiting[id(x)]:ret.append(x)
+		return ret
 	def tasks_by_max_jobs(self):
 		if not self.ready:self.prepare()
 		if not self.temp_tasks:self.temp_tasks=self.tasks_in_parallel()
@@ -218,12 +359,14 @@ class store_task_type(type):
 		if name.endswith('_task'):
 			name=name.replace('_task','')
 			TaskBase.classes[name]=cls
+			Utils.provide('task',name,cls.__module__)
 class TaskBase(object):
 	__metaclass__=store_task_type
 	color="GREEN"
 	maxjobs=MAXJOBS
 	classes={}
 	stat=None
+	path_cost=0
 	def __init__(self,*k,**kw):
 		self.hasrun=NOT_RUN
 		try:
@@ -415,9 +558,16 @@ class Task(TaskBase):
 			bld.node_sigs[variant][node.id]=sig
 			if Options.cache_global:
 				ssig=sig.encode('hex')
-				dest=os.path.join(Options.cache_global,'%s_%d_%s'%(ssig,cnt,node.name))
-				try:shutil.copy2(node.abspath(env),dest)
-				except IOError:warn('Could not write the file to the cache')
+				dest=cache_path(ssig,cnt,node.name)
+				try:
+					Utils.check_dir(os.path.dirname(dest))
+					Utils.clone_file(node.abspath(env),dest)
+					os.utime(dest,None)
+					size=os.stat(dest).st_size
+				except(IOError,OSError,Utils.WafError):
+					warn('Could not write the file to the cache')
+				else:
+					bld.cache_stored.append(size)
 				cnt+=1
 		bld.task_sigs[self.unique_id()]=self.cache_sig
 	def can_retrieve_cache(self):
@@ -430,9 +580,9 @@ class Task(TaskBase):
 		for node in self.outputs:
 			variant=node.variant(env)
 			ssig=sig.encode('hex')
-			orig=os.path.join(Options.cache_global,'%s_%d_%s'%(ssig,cnt,node.name))
+			orig=cache_path(ssig,cnt,node.name)
 			try:
-				shutil.copy2(orig,node.abspath(env))
+				Utils.clone_file(orig,node.abspath(env))
 				os.utime(orig,None)
 			except(OSError,IOError):
 				debug('task: failed retrieving file')
@@ -443,6 +593,14 @@ class Task(TaskBase):
 			self.generator.bld.node_sigs[variant][node.id]=sig
 			self.generator.bld.printout('restoring from cache %r\n'%node.bldpath(env))
 		return 1
+	def call_run(self):
+		if self.can_retrieve_cache():
+			return 0
+		if Options.cache_global:
+			for node in self.outputs:
+				try:os.remove(node.abspath(self.env))
+				except OSError:pass
+		return self.run()
 	def debug_why(self,old_sigs):
 		new_sigs=self.cache_sig
 		def v(x):
@@ -532,26 +690,30 @@ def compile_fun_shell(name,line):
 	def repl(match):
 		g=match.group
 		if g('dollar'):return"$"
-		elif g('backslash'):return'\\\\'
-		elif g('subst'):extr.append((g('var'),g('code')));return"%s"
+		elif g('backslash'):return'\\'
+		elif g('subst'):extr.append((g('var'),g('code')));return"<<|@|>>"
 		return None
-	line=reg_act.sub(repl,line)
+	params=reg_act.sub(repl,' %s '%line).split('<<|@|>>')
+	frag=[]
 	parm=[]
 	dvars=[]
 	app=parm.append
-	for(var,meth)in extr:
+	for x in xrange(len(extr)):
+		frag.append((None,params[x].replace('%','%%')))
+		(var,meth)=extr[x]
 		if var=='SRC':
+			frag.append((None,'%s'))
 			if meth:app('task.inputs%s'%meth)
 			else:app('" ".join([a.srcpath(env) for a in task.inputs])')
 		elif var=='TGT':
+			frag.append((None,'%s'))
 			if meth:app('task.outputs%s'%meth)
 			else:app('" ".join([a.bldpath(env) for a in task.outputs])')
 		else:
+			frag.append((var,None))
 			if not var in dvars:dvars.append(var)
-			app("p('%s')"%var)
-	if parm:parm="%% (%s) "%(',\n\t\t'.join(parm))
-	else:parm=''
-	c=COMPILE_TEMPLATE_SHELL%(line,parm)
+	frag.append((None,params[-1].replace('%','%%')))
+	c=COMPILE_TEMPLATE_SHELL%(tuple(frag),''.join([x+',\n\t\t'for x in parm]))
 	debug('action: %s'%c)
 	return(funex(c),dvars)
 def compile_fun_noshell(name,line):
@@ -565,25 +727,34 @@ def compile_fun_noshell(name,line):
 	params=line2.split('<<|@|>>')
 	buf=[]
 	dvars=[]
+	frags=[]
+	frag=[]
 	app=buf.append
+	def flush():
+		if frag:
+			app('lst.extend(env.get_args(frags[%d]))'%len(frags))
+			frags.append(tuple(frag))
+			del frag[:]
 	for x in xrange(len(extr)):
 		params[x]=params[x].strip()
 		if params[x]:
-			app("lst.extend(%r)"%params[x].split())
+			frag.append((None,tuple(params[x].split())))
 		(var,meth)=extr[x]
 		if var=='SRC':
+			flush()
 			if meth:app('lst.append(task.inputs%s)'%meth)
 			else:app("lst.extend([a.srcpath(env) for a in task.inputs])")
 		elif var=='TGT':
+			flush()
 			if meth:app('lst.append(task.outputs%s)'%meth)
 			else:app("lst.extend([a.bldpath(env) for a in task.outputs])")
 		else:
-			app('lst.extend(to_list(env[%r]))'%var)
+			frag.append((var,None))
 			if not var in dvars:dvars.append(var)
-	if extr:
-		if params[-1]:
-			app("lst.extend(%r)"%params[-1].split())
-	fun=COMPILE_TEMPLATE_NOSHELL%"\n\t".join(buf)
+	if params[-1].strip():
+		frag.append((None,tuple(params[-1].split())))
+	flush()
+	fun=COMPILE_TEMPLATE_NOSHELL%(tuple(frags),"\n\t".join(buf))
 	debug('action: %s'%fun)
 	return(funex(fun),dvars)
 def compile_fun(name,line,shell=None):
@@ -606,6 +777,7 @@ def task_type_from_func(name,func,vars=[],color='GREEN',ext_in=[],ext_out=[],bef
 	params={'run':func,'vars':vars,'color':color,'name':name,'ext_in':Utils.to_list(ext_in),'ext_out':Utils.to_list(ext_out),'before':Utils.to_list(before),'after':Utils.to_list(after),}
 	cls=type(Task)(name,(Task,),params)
 	TaskBase.classes[name]=cls
+	Utils.provide('task',name,func.__module__)
 	return cls
 def always_run(cls):
 	old=cls.runnable_status
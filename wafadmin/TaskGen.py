@@ -14,6 +14,7 @@ class register_obj(type):
 		suffix='_taskgen'
 		if name.endswith(suffix):
 			task_gen.classes[name.replace(suffix,'')]=cls
+			Utils.provide('class',name.replace(suffix,''),cls.__module__)
 class task_gen(object):
 	__metaclass__=register_obj
 	mappings={}
@@ -50,6 +51,10 @@ class task_gen(object):
 			if Logs.verbose>0:
 				traceback.print_stack()
 		object.__setattr__(self,real,attr)
+	def __getattr__(self,name):
+		if name.startswith('__')or not Utils.load_lazy('method',name):
+			raise AttributeError(name)
+		return getattr(self,name)
 	def to_list(self,value):
 		if isinstance(value,str):return value.split()
 		else:return value
@@ -57,6 +62,7 @@ class task_gen(object):
 		keys=set(self.meths)
 		self.features=Utils.to_list(self.features)
 		for x in self.features+['*']:
+			Utils.load_lazy('feature',x)
 			st=task_gen.traits[x]
 			if not st:
 				warn('feature %r does not exist - bind at least one method to it'%x)
@@ -114,9 +120,18 @@ class task_gen(object):
 		try:return self.mappings[ext]
 		except KeyError:
 			try:return task_gen.mappings[ext]
-			except KeyError:return None
+			except KeyError:
+				if Utils.load_lazy('extension',ext):
+					return self.get_hook(ext)
+				return None
 	def create_task(self,name,env=None):
-		task=Task.TaskBase.classes[name](env or self.env,generator=self)
+		try:
+			cls=Task.TaskBase.classes[name]
+		except KeyError:
+			if not Utils.load_lazy('task',name):
+				Utils.load_all_lazy()
+			cls=Task.TaskBase.classes[name]
+		task=cls(env or self.env,generator=self)
 		self.tasks.append(task)
 		return task
 	def name_to_obj(self,name):
@@ -129,6 +144,8 @@ class task_gen(object):
 			raise Utils.WscriptError(err_msg%'exts')
 		lst=[]
 		dirnames=self.to_list(dirnames)
+		if not exts:
+			Utils.load_all_lazy()
 		ext_lst=exts or self.mappings.keys()+task_gen.mappings.keys()
 		for name in dirnames:
 			anode=self.path.find_dir(name)
@@ -174,6 +191,7 @@ def declare_extension(var,func):
 	try:
 		for x in Utils.to_list(var):
 			task_gen.mappings[x]=func
+			Utils.provide('extension',x,func.__module__)
 	except:
 		raise Utils.WscriptError('declare_extension takes either a list or a string %r'%var)
 	task_gen.mapped[func.__name__]=func
@@ -221,18 +239,23 @@ def declare_chain(name='',action='',ext_in='',ext_out='',reentrant=1,color='BLUE
 def bind_feature(name,methods):
 	lst=Utils.to_list(methods)
 	task_gen.traits[name].update(lst)
+	Utils.provide('feature',name,None)
 def taskgen(func):
 	setattr(task_gen,func.__name__,func)
+	Utils.provide('method',func.__name__,func.__module__)
 def feature(*k):
 	def deco(func):
 		setattr(task_gen,func.__name__,func)
+		Utils.provide('method',func.__name__,func.__module__)
 		for name in k:
 			task_gen.traits[name].update([func.__name__])
+			Utils.provide('feature',name,func.__module__)
 		return func
 	return deco
 def before(*k):
 	def deco(func):
 		setattr(task_gen,func.__name__,func)
+		Utils.provide('method',func.__name__,func.__module__)
 		for fun_name in k:
 			if not func.__name__ in task_gen.prec[fun_name]:
 				task_gen.prec[fun_name].append(func.__name__)
@@ -241,6 +264,7 @@ def before(*k):
 def after(*k):
 	def deco(func):
 		setattr(task_gen,func.__name__,func)
+		Utils.provide('method',func.__name__,func.__module__)
 		for fun_name in k:
 			if not fun_name in task_gen.prec[func.__name__]:
 				task_gen.prec[func.__name__].append(fun_name)
@@ -249,9 +273,11 @@ def after(*k):
 def extension(var):
 	def deco(func):
 		setattr(task_gen,func.__name__,func)
+		Utils.provide('method',func.__name__,func.__module__)
 		try:
 			for x in Utils.to_list(var):
 				task_gen.mappings[x]=func
+				Utils.provide('extension',x,func.__module__)
 		except:
 			raise Utils.WafError('extension takes either a list or a string %r'%var)
 		task_gen.mapped[func.__name__]=func
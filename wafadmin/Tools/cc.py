@@ -56,6 +56,7 @@ def c_hook(self,node):
 cc_str='${CC} ${CCFLAGS} ${CPPFLAGS} ${_CCINCFLAGS} ${_CCDEFFLAGS} ${CC_SRC_F}${SRC} ${CC_TGT_F}${TGT}'
 cls=Task.simple_task_type('cc',cc_str,'GREEN',ext_out='.o',ext_in='.c',shell=False)
 cls.scan=ccroot.scan
+cls.prefetch=ccroot.prefetch
 cls.vars.append('CCDEPS')
 link_str='${LINK_CC} ${CCLNK_SRC_F}${SRC} ${CCLNK_TGT_F}${TGT} ${LINKFLAGS}'
 cls=Task.simple_task_type('cc_link',link_str,color='YELLOW',ext_in='.o',shell=False)
@@ -72,6 +72,12 @@ def scan(self):
 			if not x in all_names:
 				all_names.append(x)
 	return(all_nodes,all_names)
+def prefetch(self):
+	for t in self.run_after:
+		if not t.hasrun:
+			return
+	bld=self.generator.bld
+	preproc.prefetch(self.inputs+bld.node_deps.get(self.unique_id(),[]),self.env,Options.options.jobs)
 class ccroot_abstract(TaskGen.task_gen):
 	def __init__(self,*k,**kw):
 		if len(k)>1:
@@ -1,7 +1,7 @@
 #! /usr/bin/env python
 # encoding: utf-8
 
-import os,sys,imp,types,ccroot
+import os,sys,imp,types
 import optparse
 import Utils,Configure,Options
 from Logs import debug
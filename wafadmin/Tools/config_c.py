@@ -2,8 +2,12 @@
 # encoding: utf-8
 import sys
 if sys.hexversion < 0x020400f0: from sets import Set as set
-import os,imp,sys,shlex,shutil
+import os,imp,sys,shlex,shutil,tempfile
 from Utils import md5
+try:
+	import multiprocessing
+except ImportError:
+	multiprocessing=None
 import Build,Utils,Configure,Task,Options,Logs,TaskGen
 from Constants import*
 from Configure import conf,conftest
@@ -84,15 +88,56 @@ def validate_cfg(self,kw):
 		kw['okmsg']='ok'
 	if not'errmsg'in kw:
 		kw['errmsg']='not found'
+def pkgconfig_paths(self,path):
+	cache=self.__dict__.setdefault('pc_paths',{})
+	try:
+		return cache[path]
+	except KeyError:
+		pass
+	lst=os.environ.get('PKG_CONFIG_PATH','').split(os.pathsep)
+	libdir=os.environ.get('PKG_CONFIG_LIBDIR',None)
+	if libdir is None:
+		try:
+			libdir=Utils.cmd_output('%s --variable pc_path pkg-config'%path.split()[0],silent=1).strip()
+		except ValueError:
+			libdir=''
+	lst.extend(libdir.split(os.pathsep))
+	ret=cache[path]=[x for x in lst if x]
+	return ret
+def cfg_sig(self,kw):
+	names=[]
+	for x in('package','modversion'):
+		for y in Utils.to_list(kw.get(x,'')):
+			if y[0].isalpha():names.append(y)
+	lst=[kw['path'],self.program_sig(kw['path'].split()[0])]
+	lst.append([os.environ.get(x,'')for x in('PKG_CONFIG_PATH','PKG_CONFIG_LIBDIR','PKG_CONFIG_SYSROOT_DIR')])
+	for d in self.pkgconfig_paths(kw['path']):
+		for y in['']+[x+'.pc'for x in names]:
+			try:
+				st=os.stat(os.path.join(d,y))
+			except OSError:
+				continue
+			lst.append((d,y,st.st_mtime,st.st_size,st.st_ino))
+	return Utils.h_list(lst)
 def cmd_and_log(self,cmd,kw):
 	Logs.debug('runner: %s\n'%cmd)
 	if self.log:self.log.write('%s\n'%cmd)
-	try:
-		p=Utils.pproc.Popen(cmd,stdout=Utils.pproc.PIPE,shell=True)
-		output=p.communicate()[0]
-	except WindowsError:
-		self.fatal('fail')
-	if p.returncode:
+	key=None
+	ret=None
+	if'cfg_sig'in kw:
+		key=Utils.h_list((cmd,kw['cfg_sig']))
+		ret=self.get_check(key)
+	if ret:
+		(code,output)=ret
+	else:
+		try:
+			p=Utils.pproc.Popen(cmd,stdout=Utils.pproc.PIPE,shell=True)
+			output=p.communicate()[0]
+		except WindowsError:
+			self.fatal('fail')
+		code=p.returncode
+		if key:self.set_check(key,(code,output))
+	if code:
 		if not kw.get('errmsg',''):
 			if kw.get('mandatory',False):
 				kw['errmsg']=output.strip()
@@ -101,6 +146,8 @@ def cmd_and_log(self,cmd,kw):
 		self.fatal('fail')
 	return output
 def exec_cfg(self,kw):
+	if not'cfg_sig'in kw:
+		kw['cfg_sig']=self.cfg_sig(kw)
 	if'atleast_pkgconfig_version'in kw:
 		cmd='%s --atleast-pkgconfig-version=%s'%(kw['path'],kw['atleast_pkgconfig_version'])
 		self.cmd_and_log(cmd,kw)
@@ -299,9 +346,31 @@ def check(self,*k,**kw):
 	if not kw.get('execute',False):
 		return ret==0
 	return ret
+def c_check_sig(self,kw):
+	env=kw['env']
+	tbl=env.get_merged_dict()
+	defines=tbl.get(DEFINES,None)or{}
+	keys=[x for x in tbl.keys()if x!=DEFINES and not x in defines]
+	keys.sort()
+	lst=[]
+	for x in kw.keys():
+		if x in('env','msg','okmsg','errmsg','success','mandatory','cfg_sig'):continue
+		if callable(kw[x]):continue
+		lst.append((x,kw[x]))
+	lst.sort()
+	progs=[self.program_sig(env[x])for x in('CC','CXX','LINK_CC','LINK_CXX')]
+	return Utils.h_list((lst,env.hash_vars(keys),progs))
 def run_c_code(self,*k,**kw):
+	key=self.c_check_sig(kw)
+	cached=self.get_check(key)
+	if cached:
+		self.log.write("==>\n%s\n<==\n"%kw['code'])
+		(ok,ret)=cached
+		if not ok:
+			self.fatal(ret)
+		return ret
 	test_f_name=kw['compile_filename']
-	k=0
+	k=self.__dict__.get('conf_check_index',0)
 	while k<10000:
 		dir=os.path.join(self.blddir,'.conf_check_%d'%k)
 		try:
@@ -350,6 +419,7 @@ def run_c_code(self,*k,**kw):
 	os.chdir(back)
 	if ret:
 		self.log.write('command returned %r'%ret)
+		self.set_check(key,(False,str(ret)))
 		self.fatal(str(ret))
 	if kw['execute']:
 		lastprog=o.link_task.outputs[0].abspath(env)
@@ -358,8 +428,68 @@ def run_c_code(self,*k,**kw):
 		try:
 			data=Utils.cmd_output([lastprog]+args).strip()
 		except ValueError,e:
-			self.fatal(Utils.ex_stack())
+			err=Utils.ex_stack()
+			self.set_check(key,(False,err))
+			self.fatal(err)
 		ret=data
+	self.set_check(key,(True,ret))
+	return ret
+class log_sink(object):
+	def __init__(self,name):
+		self.name=name
+	def write(self,txt):
+		pass
+	def flush(self):
+		pass
+batch=[]
+def run_batch_check(idx):
+	(conf,method,kw)=batch[idx]
+	conf.log=tempfile.TemporaryFile('w+')
+	conf.check_used={}
+	conf.conf_check_index=idx+1
+	sys.stderr=log_sink('')
+	try:
+		getattr(conf,method)(**kw)
+	except Configure.ConfigurationError:
+		pass
+	except Exception:
+		return None
+	conf.log.seek(0)
+	return(conf.check_used,conf.log.read())
+def multicheck(self,*k):
+	global batch
+	env=self.env.copy()
+	checks=[]
+	for x in k:
+		kw=dict(x)
+		method=kw.pop('method','check')
+		if method!='check_cfg'and not'env'in kw:
+			kw['env']=env.copy()
+		checks.append((method,kw))
+	results=[None]*len(checks)
+	jobs=min(getattr(Options.options,'jobs',1),len(checks))
+	if multiprocessing and jobs>1 and Options.platform!='win32':
+		self.log.flush()
+		batch=[(self,method,kw)for(method,kw)in checks]
+		pool=multiprocessing.Pool(jobs)
+		try:
+			results=pool.map(run_batch_check,range(len(checks)))
+		finally:
+			pool.close()
+			pool.join()
+			batch=[]
+	ret=[]
+	for((method,kw),res)in zip(checks,results):
+		log=self.log
+		if res:
+			(used,txt)=res
+			self.check_cache.update(used)
+			log.write(txt)
+			self.log=log_sink(log.name)
+		try:
+			ret.append(getattr(self,method)(**kw))
+		finally:
+			self.log=log
 	return ret
 def check_cxx(self,*k,**kw):
 	kw['compiler']='cxx'
@@ -464,13 +594,17 @@ def cxx_load_tools(conf):
 
 conf(ret_msg)
 conf(validate_cfg)
+conf(pkgconfig_paths)
+conf(cfg_sig)
 conf(cmd_and_log)
 conf(exec_cfg)
 conf(check_cfg)
 conf(validate_c)
 conf(post_check)
 conf(check)
+conf(c_check_sig)
 conf(run_c_code)
+conf(multicheck)
 conf(check_cxx)
 conf(check_cc)
 conf(define)
@@ -57,6 +57,7 @@ def cxx_hook(self,node):
 cxx_str='${CXX} ${CXXFLAGS} ${CPPFLAGS} ${_CXXINCFLAGS} ${_CXXDEFFLAGS} ${CXX_SRC_F}${SRC} ${CXX_TGT_F}${TGT}'
 cls=Task.simple_task_type('cxx',cxx_str,color='GREEN',ext_out='.o',ext_in='.cxx',shell=False)
 cls.scan=ccroot.scan
+cls.prefetch=ccroot.prefetch
 cls.vars.append('CXXDEPS')
 link_str='${LINK_CXX} ${CXXLNK_SRC_F}${SRC} ${CXXLNK_TGT_F}${TGT} ${LINKFLAGS}'
 cls=Task.simple_task_type('cxx_link',link_str,color='YELLOW',ext_in='.o',shell=False)
@@ -0,0 +1,88 @@
+#! /usr/bin/env python
+# encoding: utf-8
+
+import os,re
+import Task,Utils,Logs,ccroot,cc,cxx
+from Utils import md5
+from Logs import debug
+re_split=re.compile(r'(?<!\\)\s+')
+def read_deps(self):
+	name=self.outputs[0].abspath(self.env)
+	name=os.path.splitext(name)[0]+'.d'
+	txt=Utils.readf(name).replace('\\\n','')
+	cwd=getattr(self,'cwd',None)or self.generator.bld.bldnode.abspath()
+	lst=re_split.split(txt.split(':',1)[1].strip())
+	return[os.path.normpath(os.path.join(cwd,x.replace('\\ ',' ')))for x in lst if x]
+def parse_deps(self,paths):
+	bld=self.generator.bld
+	srcdir=bld.srcnode.abspath()+os.sep
+	variant_dir=bld.bldnode.abspath()+os.sep+self.env.variant()+os.sep
+	nodes=[]
+	names=[]
+	for path in paths:
+		node=None
+		if path.startswith(variant_dir):
+			node=bld.srcnode.find_resource(path[len(variant_dir):])
+		elif path.startswith(srcdir):
+			node=bld.srcnode.find_resource(path[len(srcdir):])
+		if node is None:
+			if not path in names:names.append(path)
+		elif not node in nodes and not node in self.inputs:
+			nodes.append(node)
+	return(nodes,names)
+def scan(self):
+	if not self.env['GCCDEPS']:
+		return ccroot.scan(self)
+	bld=self.generator.bld
+	key=self.unique_id()
+	return(bld.node_deps.get(key,[]),bld.raw_deps.get(key,[]))
+def prefetch(self):
+	if not self.env['GCCDEPS']:
+		ccroot.prefetch(self)
+def can_retrieve_cache(self):
+	self.cached=Task.Task.can_retrieve_cache(self)
+	return self.cached
+def post_run(self):
+	if not self.env['GCCDEPS']or getattr(self,'cached',None):
+		Task.Task.post_run(self)
+		return
+	self.dep_paths=read_deps(self)
+def serial_post_run(self):
+	paths=getattr(self,'dep_paths',None)
+	if paths is None:
+		return
+	del self.dep_paths
+	bld=self.generator.bld
+	key=self.unique_id()
+	(nodes,names)=parse_deps(self,paths)
+	if Logs.verbose:
+		debug('deps: gcc deps for %s: %r; outside the project %r'%(str(self),nodes,names))
+	bld.node_deps[key]=nodes
+	bld.raw_deps[key]=names
+	(sig,exp_sig,imp_sig,var_sig)=self.cache_sig
+	try:
+		imp_sig=self.compute_sig_implicit_deps()
+	except(KeyError,OSError):
+		pass
+	else:
+		m=md5()
+		m.update(exp_sig)
+		m.update(imp_sig)
+		m.update(var_sig)
+		self.cache_sig=(m.digest(),exp_sig,imp_sig,var_sig)
+	Task.Task.post_run(self)
+def detect(conf):
+	v=conf.env
+	if v['CC_NAME']!='gcc'and v['CXX_NAME']!='gcc':
+		conf.fatal('the gcc dependency mode requires gcc or g++')
+	v['GCCDEPS']=True
+	v.append_unique('CCFLAGS','-MMD')
+	v.append_unique('CXXFLAGS','-MMD')
+def setup(bld):
+	for name in('cc','cxx'):
+		cls=Task.TaskBase.classes[name]
+		cls.scan=scan
+		cls.prefetch=prefetch
+		cls.can_retrieve_cache=can_retrieve_cache
+		cls.post_run=post_run
+		cls.serial_post_run=serial_post_run
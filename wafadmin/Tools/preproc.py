@@ -2,9 +2,13 @@
 # encoding: utf-8
 
 import re,sys,os,string
-import Logs,Build,Utils
+import Logs,Build,Utils,Runner
 from Logs import debug,error
 import traceback
+try:
+	import multiprocessing
+except ImportError:
+	multiprocessing=None
 class PreprocError(Utils.WafError):
 	pass
 POPFILE='-'
@@ -49,6 +53,43 @@ def filter_comments(filename):
 	code=re_nl.sub('',code)
 	code=re_cpp.sub(repl,code)
 	return[(m.group(2),m.group(3))for m in re.finditer(re_lines,code)]
+def read_lines(filename):
+	lines=filter_comments(filename)
+	lines.append((POPFILE,''))
+	return lines
+pool=None
+pending={}
+def file_sig(bld,node,env):
+	if not node.parent.id in bld.cache_scanned_folders:
+		bld.rescan(node.parent)
+	if node.id&3==2:
+		return bld.node_sigs[0].get(node.id,None)
+	return bld.node_sigs[node.variant(env)].get(node.id,None)
+def stop_pool(par):
+	global pool
+	if pool:
+		pool.terminate()
+		pool.join()
+		pool=None
+	pending.clear()
+Runner.stop_hooks.append(stop_pool)
+def prefetch(nodes,env,jobs):
+	global pool
+	if not multiprocessing or jobs<2 or env['GCCDEPS']:
+		return
+	bld=nodes[0].__class__.bld
+	todo=[]
+	for node in nodes:
+		sig=file_sig(bld,node,env)
+		if sig and not sig in bld.parse_lines and not sig in pending:
+			todo.append((sig,node.abspath(env)))
+	if not todo:
+		return
+	if not pool:
+		pool=multiprocessing.Pool(jobs)
+	debug('preproc: reading %d files in the background'%len(todo))
+	for(sig,filepath)in todo:
+		pending[sig]=pool.apply_async(read_lines,(filepath,))
 prec={}
 ops=['* / %','+ -','<< >>','< <= >= >','== !=','& | ^','&& ||',',']
 for x in range(len(ops)):
@@ -461,19 +502,26 @@ class c_parser(object):
 		filepath=node.abspath(self.env)
 		self.count_files+=1
 		if self.count_files>30000:raise PreprocError("recursion limit exceeded")
-		pc=self.parse_cache
 		debug('preproc: reading file %r'%filepath)
+		key=file_sig(node.__class__.bld,node,self.env)
+		if key:
+			pc=node.__class__.bld.parse_lines
+		else:
+			pc=self.parse_cache
+			key=filepath
 		try:
-			lns=pc[filepath]
+			lns=pc[key]
 		except KeyError:
 			pass
 		else:
 			self.lines=lns+self.lines
 			return
 		try:
-			lines=filter_comments(filepath)
-			lines.append((POPFILE,''))
-			pc[filepath]=lines
+			if key in pending:
+				lines=pending.pop(key).get()
+			else:
+				lines=read_lines(filepath)
+			pc[key]=lines
 			self.lines=lines+self.lines
 		except IOError:
 			raise PreprocError("could not read the file %s"%filepath)
@@ -558,9 +606,34 @@ class c_parser(object):
 		elif token=='pragma':
 			if re_pragma_once.search(line.lower()):
 				self.ban_includes.append(self.curfile)
+def deps_sig(bld,env,lst):
+	m=Utils.md5()
+	upd=m.update
+	tstamp=bld.node_sigs
+	for k in lst:
+		if not k.parent.id in bld.cache_scanned_folders:
+			bld.rescan(k.parent)
+		if k.id&3==2:
+			upd(tstamp[0][k.id])
+		else:
+			upd(tstamp[env.variant()][k.id])
+	return m.digest()
 def get_deps(node,env,nodepaths=[]):
+	bld=node.__class__.bld
+	key=(node.id,Utils.h_list(env['DEFLINES']),tuple([x.id for x in nodepaths]))
+	try:
+		(nodes,names,sig)=bld.dep_index[key]
+		if sig==deps_sig(bld,env,[node]+nodes):
+			debug('preproc: reusing the dependencies of %s'%node.name)
+			return(list(nodes),list(names))
+	except(KeyError,OSError):
+		pass
 	gruik=c_parser(nodepaths)
 	gruik.start(node,env)
+	try:
+		bld.dep_index[key]=(gruik.nodes[:],gruik.names[:],deps_sig(bld,env,[node]+gruik.nodes))
+	except(KeyError,OSError):
+		pass
 	return(gruik.nodes,gruik.names)
 re_inc=re.compile('^[ \t]*(#|%:)[ \t]*(include)[ \t]*(.*)\r*$',re.IGNORECASE|re.MULTILINE)
 def lines_includes(filename):
@@ -58,6 +58,7 @@ def byte_compile_py(self):
 				except OSError:
 					pass
 		if self.bld.is_install>0:
+			self.bld.wait_install()
 			if self.env['PYC']or self.env['PYO']:
 				info("* byte compiling python files")
 			if self.env['PYC']:
@@ -1,7 +1,7 @@
 #! /usr/bin/env python
 # encoding: utf-8
 
-import os.path,shutil
+import os.path,shutil,shlex,time
 import Task,Runner,Utils,Logs,Build,Node
 from TaskGen import extension,after,before
 EXT_VALA=['.vala','.gs']
@@ -9,16 +9,15 @@ class valac_task(Task.Task):
 	vars=("VALAC","VALAC_VERSION","VALAFLAGS")
 	before=("cc","cxx")
 	def run(self):
+		t=time.time()
 		env=self.env
 		inputs=[a.srcpath(env)for a in self.inputs]
-		valac=env['VALAC']
-		vala_flags=env.get_flat('VALAFLAGS')
 		top_src=self.generator.bld.srcnode.abspath()
 		top_bld=self.generator.bld.srcnode.abspath(env)
+		cmd=[env['VALAC'],'-C']
 		if env['VALAC_VERSION']>(0,1,6):
-			cmd=[valac,'-C','--quiet',vala_flags]
-		else:
-			cmd=[valac,'-C',vala_flags]
+			cmd.append('--quiet')
+		cmd.extend(shlex.split(env.get_flat('VALAFLAGS')))
 		if self.threading:
 			cmd.append('--thread')
 		if self.target_glib:
@@ -26,29 +25,30 @@ class valac_task(Task.Task):
 		features=self.generator.features
 		if'cshlib'in features or'cstaticlib'in features:
 			output_dir=self.outputs[0].bld_dir(env)
-			cmd.append('--library '+self.target)
+			cmd.extend(['--library',self.target])
 			if env['VALAC_VERSION']>=(0,7,0):
 				header_basename=getattr(self,'header',self.target)
-				cmd.append('--header '+os.path.join(output_dir,header_basename+'.h'))
+				cmd.extend(['--header',os.path.join(output_dir,header_basename+'.h')])
 				self.outputs.append(self.generator.path.find_or_declare(header_basename+'.h'))
 				if env['VALAC_VERSION']>(0,7,5):
 					includedir=self.generator.path.abspath().replace(top_src+'/','',1)
-					cmd.append('--includedir '+includedir)
-			cmd.append('--basedir '+top_src)
-			cmd.append('-d '+top_bld)
+					cmd.extend(['--includedir',includedir])
+			cmd.extend(['--basedir',top_src])
+			cmd.extend(['-d',top_bld])
 			if env['VALAC_VERSION']>(0,7,2)and hasattr(self,'gir'):
 				cmd.append('--gir=%s.gir'%self.gir)
 		else:
 			output_dir=self.outputs[0].bld_dir(env)
-			cmd.append('-d %s'%output_dir)
+			cmd.extend(['-d',output_dir])
 		for vapi_dir in self.vapi_dirs:
 			cmd.append('--vapidir=%s'%vapi_dir)
 		for package in self.packages:
-			cmd.append('--pkg %s'%package)
+			cmd.extend(['--pkg',package])
 		for package in self.packages_private:
-			cmd.append('--pkg %s'%package)
-		cmd.append(" ".join(inputs))
-		result=self.generator.bld.exec_command(" ".join(cmd))
+			cmd.extend(['--pkg',package])
+		cmd.extend(inputs)
+		self.cmd_time=time.time()-t
+		result=self.generator.bld.exec_command(cmd)
 		if not'cprogram'in features:
 			if self.packages:
 				filename=os.path.join(self.generator.path.abspath(env),"%s.deps"%self.target)
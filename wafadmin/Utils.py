@@ -2,7 +2,9 @@
 # encoding: utf-8
 import sys
 if sys.hexversion < 0x020400f0: from sets import Set as set
-import os,sys,imp,string,errno,traceback,inspect,re,shutil,datetime,gc
+import os,sys,imp,string,errno,traceback,re,shutil,datetime,gc,threading,struct
+try:import cPickle
+except ImportError:import pickle as cPickle
 try:from UserDict import UserDict
 except ImportError:from collections import UserDict
 if sys.hexversion>=0x2060000 or os.name=='java':
@@ -94,20 +96,148 @@ class ordered_dict(UserDict):
 	def __setitem__(self,key,item):
 		if key not in self.allkeys:self.allkeys.append(key)
 		UserDict.__setitem__(self,key,item)
+fork_server=False
+FORK_SERVER='''
+import os,sys,struct,errno
+import subprocess
+try:import cPickle as pickle
+except ImportError:import pickle
+rfd=int(sys.argv[1])
+wfd=int(sys.argv[2])
+def read(n):
+	buf=[]
+	while n:
+		s=os.read(rfd,n)
+		if not s:sys.exit(0)
+		buf.append(s)
+		n-=len(s)
+	return ''.join(buf)
+def write(data):
+	while data:
+		data=data[os.write(wfd,data):]
+while 1:
+	(cmd,shell,cwd,env,capture)=pickle.loads(read(struct.unpack('!I',read(4))[0]))
+	out=''
+	cpu=0.0
+	try:
+		if capture:
+			p=subprocess.Popen(cmd,shell=shell,cwd=cwd,env=env,stdout=subprocess.PIPE,stderr=subprocess.STDOUT)
+			out=p.stdout.read()
+			p.stdout.close()
+		else:
+			p=subprocess.Popen(cmd,shell=shell,cwd=cwd,env=env)
+		while 1:
+			try:
+				(pid,status,usage)=os.wait4(p.pid,0)
+			except OSError:
+				if sys.exc_info()[1].errno==errno.EINTR:continue
+				raise
+			break
+		if os.WIFSIGNALED(status):ret=-os.WTERMSIG(status)
+		else:ret=os.WEXITSTATUS(status)
+		cpu=usage.ru_utime+usage.ru_stime
+	except OSError:
+		ret=-1
+	data=pickle.dumps((ret,out,cpu),-1)
+	write(struct.pack('!I',len(data))+data)
+'''
+class fork_client(object):
+	lock=threading.Lock()
+	idle=[]
+	def __init__(self):
+		import fcntl
+		self.lock.acquire()
+		try:
+			(r1,w1)=os.pipe()
+			(r2,w2)=os.pipe()
+			for fd in(w1,r2):
+				fcntl.fcntl(fd,fcntl.F_SETFD,fcntl.fcntl(fd,fcntl.F_GETFD)|fcntl.FD_CLOEXEC)
+			try:
+				self.proc=pproc.Popen([sys.executable,'-c',FORK_SERVER,str(r1),str(w2)])
+			finally:
+				os.close(r1)
+				os.close(w2)
+		finally:
+			self.lock.release()
+		self.wfd=w1
+		self.rfd=r2
+	def close(self):
+		os.close(self.wfd)
+		os.close(self.rfd)
+	def read(self,n):
+		buf=[]
+		while n:
+			s=os.read(self.rfd,n)
+			if not s:raise OSError(errno.EPIPE,'the fork server exited')
+			buf.append(s)
+			n-=len(s)
+		return''.join(buf)
+	def run(self,cmd,shell,cwd,env,capture):
+		data=cPickle.dumps((cmd,shell,cwd,env,capture),-1)
+		data=struct.pack('!I',len(data))+data
+		while data:
+			data=data[os.write(self.wfd,data):]
+		return cPickle.loads(self.read(struct.unpack('!I',self.read(4))[0]))
+def exec_forked(s,kw):
+	try:
+		client=fork_client.idle.pop()
+	except IndexError:
+		client=fork_client()
+	env=kw.get('env',None)or dict(os.environ)
+	cwd=kw.get('cwd',None)or os.getcwd()
+	log=kw.get('log',None)
+	try:
+		(ret,out,cpu)=client.run(s,isinstance(s,str),cwd,env,log is not None)
+	except(OSError,EOFError):
+		client.close()
+		return-1
+	fork_client.idle.append(client)
+	if out:log.write(out)
+	t=threading.currentThread()
+	if hasattr(t,'cpu_time'):
+		t.cpu_time+=cpu
+	return ret
+def task_output(kw):
+	if not('log'in kw or'stdout'in kw or'stderr'in kw):
+		f=getattr(threading.currentThread(),'output',None)
+		if f:kw['log']=f
 def exec_command(s,**kw):
+	task_output(kw)
+	if fork_server and not[x for x in kw if not x in('cwd','env','log')]:
+		return exec_forked(s,kw)
 	if'log'in kw:
 		kw['stdout']=kw['stderr']=kw['log']
 		del(kw['log'])
 	kw['shell']=isinstance(s,str)
 	try:
 		proc=pproc.Popen(s,**kw)
-		return proc.wait()
+		return wait_process(proc)
 	except OSError:
 		return-1
+def wait_process(proc):
+	if not hasattr(os,'wait4'):
+		return proc.wait()
+	while 1:
+		try:
+			(pid,status,usage)=os.wait4(proc.pid,0)
+		except OSError,e:
+			if e.errno==errno.EINTR:continue
+			if e.errno==errno.ECHILD:return proc.wait()
+			raise
+		break
+	if os.WIFSIGNALED(status):
+		proc.returncode=-os.WTERMSIG(status)
+	else:
+		proc.returncode=os.WEXITSTATUS(status)
+	t=threading.currentThread()
+	if hasattr(t,'cpu_time'):
+		t.cpu_time+=usage.ru_utime+usage.ru_stime
+	return proc.returncode
 if is_win32:
 	old_log=exec_command
 	def exec_command(s,**kw):
 		if len(s)<2000:return old_log(s,**kw)
+		task_output(kw)
 		if'log'in kw:
 			kw['stdout']=kw['stderr']=kw['log']
 			del(kw['log'])
@@ -259,6 +389,7 @@ def h_fun(fun):
 	try:
 		return fun.code
 	except AttributeError:
+		import inspect
 		try:
 			h=inspect.getsource(fun)
 		except IOError:
@@ -322,16 +453,44 @@ def detect_platform():
 	if os.name in'posix java os2'.split():
 		return os.name
 	return s
+loading=[]
+lazy_index={}
+lazy_paths={}
+def provide(kind,name,module):
+	if not module or module in('Task','TaskGen'):
+		module=loading and loading[-1]or None
+	if not module in sys.modules:
+		return
+	lst=lazy_index.setdefault((kind,name),[])
+	if not module in lst:
+		lst.append(module)
+def load_lazy(kind,name):
+	ret=False
+	for x in lazy_index.get((kind,name),()):
+		if not x in sys.modules:
+			load_tool(x,lazy_paths.get(x,None))
+			ret=True
+	return ret
+def load_all_lazy():
+	ret=False
+	for lst in list(lazy_index.values()):
+		for x in lst:
+			if not x in sys.modules:
+				load_tool(x,lazy_paths.get(x,None))
+				ret=True
+	return ret
 def load_tool(tool,tooldir=None):
 	if tooldir:
 		assert isinstance(tooldir,list)
 		sys.path=tooldir+sys.path
+	loading.append(tool)
 	try:
 		try:
 			return __import__(tool)
 		except ImportError,e:
 			raise WscriptError(e)
 	finally:
+		loading.pop()
 		if tooldir:
 			for d in tooldir:
 				sys.path.remove(d)
@@ -363,7 +522,7 @@ class Context(object):
 	curdir=property(get_curdir,set_curdir)
 	def recurse(self,dirs,name=''):
 		if not name:
-			name=inspect.stack()[1][3]
+			name=sys._getframe(1).f_code.co_name
 		if isinstance(dirs,str):
 			dirs=to_list(dirs)
 		for x in dirs:
@@ -405,6 +564,45 @@ class Context(object):
 					self.curdir=old
 				if getattr(self.__class__,'post_recurse',None):
 					self.post_recurse(txt,base+'_'+name,nexdir)
+FICLONE=0x40049409
+def clone_file(src,dst,link=True,reflink=True):
+	tmp='%s.%d.%d.tmp'%(dst,os.getpid(),id(threading.currentThread()))
+	try:
+		done=False
+		if reflink and sys.platform.startswith('linux'):
+			try:
+				import fcntl
+				fsrc=open(src,'rb')
+				try:
+					fdst=open(tmp,'wb')
+					try:fcntl.ioctl(fdst.fileno(),FICLONE,fsrc.fileno())
+					finally:fdst.close()
+				finally:fsrc.close()
+				shutil.copystat(src,tmp)
+				done=True
+			except(IOError,OSError,ImportError):
+				pass
+		if not done and link and hasattr(os,'link'):
+			try:
+				try:os.remove(tmp)
+				except OSError:pass
+				os.link(src,tmp)
+				done=True
+			except OSError:
+				pass
+		if not done:
+			shutil.copy2(src,tmp)
+		if is_win32:
+			try:os.remove(dst)
+			except OSError:pass
+		if hasattr(os.path,'samefile')and os.path.exists(dst)and os.path.samefile(tmp,dst):
+			os.remove(tmp)
+		else:
+			os.rename(tmp,dst)
+	except:
+		try:os.remove(tmp)
+		except OSError:pass
+		raise
 if is_win32:
 	old=shutil.copy2
 	def copy2(src,dst):